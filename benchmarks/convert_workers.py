@@ -0,0 +1,67 @@
+"""
+Compare threads and processes to run the primary, then secondary, formatters of the conversion.
+
+    python -m benchmarks.convert_workers fr --count 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import tempfile
+from functools import partial
+from pathlib import Path
+
+from wikidict import convert
+
+from .utils import load_rendered_words, timeit
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("locale")
+    parser.add_argument("--count", type=int, default=10_000, help="number of words to convert")
+    parser.add_argument(
+        "--input",
+        type=Path,
+        help="a data-*.jsonl file, defaults to the latest one for LOCALE, or to rendered test pages when there is none",
+    )
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    words = load_rendered_words(args.locale, file=args.input, count=args.count)
+    variants = convert.make_variants(words)
+    resolved_variants = convert.resolve_variants(words, variants)
+
+    print(f"Converting {len(words):,} words, and {len(variants):,} variants ({args.locale}) ...")
+    print(f"{'formatters':>10} {'threads':>9} {'processes':>10} {'speed-up':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_dir = Path(tmp_dir)
+        for name, formatters in (
+            ("primary", convert.get_primary_formatters()),
+            ("secondary", convert.get_secondary_formatters()),
+        ):
+            timings = [
+                timeit(
+                    partial(
+                        convert.distribute_workload,
+                        formatters,
+                        output_dir,
+                        Path("data-20250401.jsonl"),
+                        args.locale,
+                        words,
+                        variants,
+                        processes=processes,
+                        resolved_variants=resolved_variants,
+                    ),
+                    repeat=1,
+                )
+                for processes in (False, True)
+            ]
+            print(f"{name:>10} {timings[0]:>9.2f} {timings[1]:>10.2f} {timings[0] / timings[1]:>8.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
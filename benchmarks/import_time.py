@@ -0,0 +1,58 @@
+"""
+Measure the start-up cost of `python -m wikidict LOCALE --get-word=WORD`, without the network part.
+Importing only the requested locale is compared to importing all of them.
+
+    python -m benchmarks.import_time fr --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from functools import partial
+
+from .utils import timeit
+
+# What `--get-word` needs before fetching the word: the CLI, the rendering machinery, and the locale data
+GET_WORD = """
+from wikidict import __main__, get_word, lang, utils
+lang.adjust_wikicode[{locale!r}]
+utils.compile_templates_multi({locale!r})
+"""
+
+ALL_LOCALES = """
+from wikidict import lang
+for locale in lang.adjust_wikicode:
+    lang.adjust_wikicode[locale]
+"""
+
+
+def run(code: str) -> None:
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("locale")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs, the best one is kept")
+    args = parser.parse_args()
+
+    scenarios = {
+        "python": "pass",
+        args.locale: GET_WORD.format(locale=args.locale),
+        "all locales": GET_WORD.format(locale=args.locale) + ALL_LOCALES,
+    }
+
+    print(f"{'scenario':>12} {'seconds':>9} {'+python':>9}")
+    reference = 0.0
+    for name, code in scenarios.items():
+        elapsed = timeit(partial(run, code), repeat=args.repeat)
+        reference = reference or elapsed
+        print(f"{name:>12} {elapsed:>9.3f} {elapsed - reference:>9.3f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+"""
+Compare the former, and the current, selection of words put into Mobi dictionaries, in time and peak memory.
+Words using the least-used characters are removed until only `--max-chars` unique characters remain.
+
+    python -m benchmarks.mobi_words fr --count 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Callable
+from functools import partial
+
+from wikidict import convert
+from wikidict.stubs import Word, Words
+
+from .utils import load_rendered_words, timeit
+
+
+def former_prepare_mobi_words(words: Words, max_chars: int) -> Words:
+    """The selection as it was done into `run_mobi_formatter()`, before `prepare_mobi_words()`."""
+    words = words.copy()
+
+    def all_chars(word: str, details: Word) -> set[str]:
+        # Note: definitions, and etymologies, are never strings, nor tuples, only the word counts
+        return set(word)
+
+    stats = defaultdict(list)
+    for word, details in words.copy().items():
+        if len(word) > 127:
+            truncated = word[:127]
+            words[truncated] = words.pop(word)
+            word = truncated
+        for char in all_chars(word, details):
+            stats[char].append(word)
+
+    if len(stats) <= max_chars:
+        return words
+
+    new_words = words.copy()
+    threshold = 1
+    while len(stats) > max_chars:
+        # Note: the key was `(char, len(v[1]))`, `char` being the same for all items
+        for char, related_words in sorted(stats.copy().items(), key=lambda v: len(v[1])):
+            if len(related_words) == threshold:
+                for w in related_words:
+                    new_words.pop(w, None)
+                stats.pop(char)
+            if len(stats) <= max_chars:
+                break
+        threshold += 1
+    return new_words
+
+
+def measure(func: Callable[[], Words], repeat: int) -> tuple[float, int]:
+    """Return the best wall time, and the peak of memory allocations, of `func`."""
+    elapsed = timeit(func, repeat=repeat)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("locale")
+    parser.add_argument("--count", type=int, default=100_000, help="number of words to select from")
+    parser.add_argument("--max-chars", type=int, help="defaults to half of the unique characters of words")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs, the best one is kept")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    if args.locale not in convert.constants.MOBI_CLEANUP:
+        parser.error(f"words are removed only for {', '.join(sorted(convert.constants.MOBI_CLEANUP))}")
+
+    words = load_rendered_words(args.locale, count=args.count)
+    max_chars = args.max_chars or len({char for word in words for char in word}) // 2
+
+    former = former_prepare_mobi_words(words, max_chars)
+    current = convert.prepare_mobi_words(args.locale, words, max_chars=max_chars)
+    assert current == former, "Selections differ"
+    print(f"Kept {len(current):,} words out of {len(words):,}, with {max_chars} unique characters ({args.locale})")
+
+    print(f"{'selection':>10} {'seconds':>9} {'peak MiB':>9}")
+    for name, func in (
+        ("former", partial(former_prepare_mobi_words, words, max_chars)),
+        ("current", partial(convert.prepare_mobi_words, args.locale, words, max_chars=max_chars)),
+    ):
+        elapsed, peak = measure(func, args.repeat)
+        print(f"{name:>10} {elapsed:>9.3f} {peak / 1024 / 1024:>9.2f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
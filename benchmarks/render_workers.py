@@ -0,0 +1,49 @@
+"""
+Measure how the rendering throughput scales with the number of workers.
+
+    python -m benchmarks.render_workers fr --count 10000 --workers 1,2,4,8
+"""
+
+from __future__ import annotations
+
+import argparse
+from functools import partial
+from pathlib import Path
+
+from wikidict import render
+
+from .utils import cpu_count, load_words, timeit
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("locale")
+    parser.add_argument("--count", type=int, default=10_000, help="number of words to render")
+    parser.add_argument(
+        "--workers",
+        type=lambda value: [int(workers) for workers in value.split(",")],
+        default=[1 << n for n in range(cpu_count().bit_length()) if 1 << n <= cpu_count()],
+        help="comma-separated numbers of workers, defaults to powers of 2 up to the number of CPU",
+    )
+    parser.add_argument(
+        "--input",
+        type=Path,
+        help="a data_wikicode-*.jsonl file, defaults to the latest one for LOCALE, or to test pages when there is none",
+    )
+    args = parser.parse_args()
+
+    words = load_words(args.locale, file=args.input, count=args.count)
+
+    print(f"Rendering {len(words):,} words ({args.locale}) ...")
+    print(f"{'workers':>8} {'seconds':>9} {'words/s':>9} {'speed-up':>9}")
+    reference = 0.0
+    for workers in args.workers:
+        elapsed = timeit(partial(render.render, words, args.locale, workers), repeat=1)
+        reference = reference or elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {len(words) / elapsed:>9,.0f} {reference / elapsed:>8.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,82 @@
+"""
+Measure the `transform()` speed-up brought by compiling *templates_multi* expressions.
+
+Templates are collected from test pages of each locale, and only those handled by *templates_multi* are kept.
+The reference evaluates expression sources on every call, as it was done before.
+
+    python -m benchmarks.transform [LOCALE ...] [--repeat=5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+from functools import partial
+from unittest.mock import patch
+
+from wikidict import lang, utils
+
+from .utils import TESTS_DATA, timeit
+
+RE_TEMPLATE = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+def collect_templates(locale: str) -> list[tuple[str, str]]:
+    """Collect `(word, template)` pairs from test pages that are handled by *templates_multi*."""
+    templates = []
+    for file in sorted((TESTS_DATA / locale).glob("*.wiki")):
+        for template in RE_TEMPLATE.findall(file.read_text(encoding="utf-8")):
+            if template.split("|", 1)[0].strip() in lang.templates_multi[locale]:
+                templates.append((file.stem, template))
+
+    # Skip templates that cannot be rendered on their own
+    valid = []
+    for word, template in templates:
+        try:
+            utils.transform(word, template, locale)
+        except Exception:
+            continue
+        valid.append((word, template))
+    return valid
+
+
+def evaluate_sources(locale: str) -> dict[str, utils.TemplateMulti]:
+    """The reference: expressions are parsed, and compiled, on every call."""
+    namespace = vars(utils)
+    return {
+        tpl: partial(lambda src, tpl, parts, word, locale: eval(src, namespace, locals()), src)
+        for tpl, src in lang.templates_multi[locale].items()
+    }
+
+
+def run(templates: list[tuple[str, str]], locale: str) -> None:
+    for word, template in templates:
+        utils.transform(word, template, locale)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("locales", nargs="*", default=sorted(lang.templates_multi))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'locale':>6} {'templates':>9} {'eval (ms)':>10} {'compiled (ms)':>14} {'speed-up':>9}")
+    for locale in args.locales:
+        if not (templates := collect_templates(locale)):
+            continue
+
+        func = partial(run, templates, locale)
+        sources = evaluate_sources(locale)
+        with patch.object(utils, "compile_templates_multi", lambda _: sources):
+            reference = timeit(func, repeat=args.repeat)
+        compiled = timeit(func, repeat=args.repeat)
+        print(
+            f"{locale:>6} {len(templates):>9} {reference * 1000:>10.2f} {compiled * 1000:>14.2f} "
+            f"{reference / compiled:>8.2f}x"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+"""Helpers shared by benchmarks."""
+
+from __future__ import annotations
+
+import multiprocessing
+from collections.abc import Callable
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from wikidict import convert, render, utils
+from wikidict.stubs import Words
+
+TESTS_DATA = Path(__file__).parent.parent / "tests" / "data"
+
+
+def load_words(locale: str, *, file: Path | None = None, count: int = 10_000) -> dict[str, str]:
+    """Load up to `count` words to work on.
+    They come from `file`, else the latest parsed dump of `locale`, else test pages duplicated as needed.
+    """
+    if not file:
+        lang_src, lang_dst = utils.guess_locales(locale, use_log=False)
+        file = render.get_latest_json_file(render.get_source_dir(lang_src, lang_dst))
+
+    if file:
+        return dict(islice(render.load(file), count))
+
+    lang_src, _ = utils.guess_locales(locale, use_log=False)
+    pages = {file.stem: file.read_text(encoding="utf-8") for file in sorted((TESTS_DATA / lang_src).glob("*.wiki"))}
+    if not pages:
+        raise SystemExit(f"No data found for {locale!r}, run with --parse first.")
+
+    words: dict[str, str] = {}
+    for n in range(count // len(pages) + 1):
+        words |= {f"{word} {n}" if n else word: code for word, code in pages.items()}
+    return dict(list(words.items())[:count])
+
+
+def load_rendered_words(locale: str, *, file: Path | None = None, count: int = 10_000) -> Words:
+    """Load up to `count` rendered words to work on.
+    They come from `file`, else the latest rendered dump of `locale`, else words from `load_words()` rendered on the fly.
+    """
+    if not file:
+        lang_src, lang_dst = utils.guess_locales(locale, use_log=False)
+        file = convert.get_latest_json_file(render.get_source_dir(lang_src, lang_dst))
+
+    if file:
+        words = convert.load(file)
+        return dict(list(words.items())[:count])
+
+    return render.render(load_words(locale, count=count), locale, cpu_count())
+
+
+def timeit(func: Callable[[], Any], *, repeat: int = 3) -> float:
+    """Return the best wall time of `repeat` calls of `func`."""
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def cpu_count() -> int:
+    return multiprocessing.cpu_count()
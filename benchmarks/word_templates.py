@@ -0,0 +1,61 @@
+"""
+Compare the rendering of words by Jinja templates, and by their fast path, in entries per second.
+
+    python -m benchmarks.word_templates fr --count 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import tempfile
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+from wikidict import convert
+
+from .utils import load_rendered_words, timeit
+
+
+def render_all(formatter: convert.BaseFormat) -> int:
+    words = formatter.words
+    return sum(len(rendered) for word in words for rendered in formatter.handle_word_modes(word, words))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("locale")
+    parser.add_argument("--count", type=int, default=10_000, help="number of words to render")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs, the best one is kept")
+    parser.add_argument("--input", type=Path, help="a data-*.jsonl file, defaults to the latest one for LOCALE")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    words = load_rendered_words(args.locale, file=args.input, count=args.count)
+    variants = convert.make_variants(words)
+    resolved_variants = convert.resolve_variants(words, variants)
+
+    print(f"{'formatter':>15} {'jinja':>12} {'fast path':>12} {'speed-up':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for cls in (convert.KoboFormat, convert.DictFileFormat):
+            formatter = cls(
+                args.locale,
+                Path(tmp_dir),
+                words,
+                variants,
+                "20250401",
+                include_etymology=None,
+                resolved_variants=resolved_variants,
+            )
+            entries = render_all(formatter)
+            with patch.dict(convert.FAST_RENDERERS, clear=True):
+                jinja = entries / timeit(partial(render_all, formatter), repeat=args.repeat)
+            fast = entries / timeit(partial(render_all, formatter), repeat=args.repeat)
+            print(f"{cls.__name__:>15} {jinja:>10,.0f}/s {fast:>10,.0f}/s {fast / jinja:>8.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
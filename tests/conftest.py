@@ -3,11 +3,16 @@
 import sys
 from collections.abc import Callable, Generator
 from pathlib import Path
+from unittest.mock import patch
 from xml.sax.saxutils import escape
 
 import pytest
 
+from wikidict import caches, session
+
 os.environ["CWD"] = str(Path(__file__).parent)
+# No retries of failed HTTP requests, tests of retries turn them on
+os.environ["HTTP_MAX_RETRIES"] = "0"
 
 
 XML = '<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/" xml:lang="{locale}">'
@@ -49,6 +54,22 @@ def no_warnings(recwarn: pytest.WarningsRecorder) -> Generator[None]:
     assert not warnings
 
 
+@pytest.fixture(autouse=True, scope="session")
+def cache_files(tmp_path_factory: pytest.TempPathFactory) -> Generator[Path]:
+    """Databases of caches are built out of "data", as every folder there is a locale."""
+    path = tmp_path_factory.mktemp("caches")
+    with patch.object(caches, "get_file", lambda kind: path / f"{kind}.sqlite"):
+        yield path
+
+
+@pytest.fixture(autouse=True, scope="session")
+def http_cache_file(tmp_path_factory: pytest.TempPathFactory) -> Generator[Path]:
+    """The database of HTTP responses is built out of "data" too."""
+    file = tmp_path_factory.mktemp("http") / "http-cache.sqlite"
+    with patch.object(session, "get_cache_file", lambda: file):
+        yield file
+
+
 @pytest.fixture(scope="session")
 def craft_data() -> Callable[[str], bytes]:
     def _craft_data(locale: str) -> bytes:
@@ -68,6 +89,30 @@ def _craft_data(locale: str) -> bytes:
     return _craft_data
 
 
+@pytest.fixture(scope="session")
+def craft_multistream_data() -> Callable[[str, int], tuple[bytes, bytes]]:
+    """Craft a multistream dump, and its index, with `pages_per_stream` pages per BZ2 stream."""
+
+    def _craft_multistream_data(locale: str, pages_per_stream: int) -> tuple[bytes, bytes]:
+        data_dir = Path(os.environ["CWD"]) / "data" / locale
+        files = [file for file in sorted(data_dir.glob("*.wiki")) if file.stem != "vide"]
+
+        dump = bz2.compress(XML.format(locale=locale).encode("utf-8"))
+        index = ""
+        for idx in range(0, len(files), pages_per_stream):
+            content = ""
+            for page_id, file in enumerate(files[idx : idx + pages_per_stream], start=idx + 1):
+                text = escape(file.read_text(encoding="utf-8"))
+                content += PAGE_XML.format(word=file.stem, revision=42, text=text)
+                index += f"{len(dump)}:{page_id}:{file.stem}\n"
+            dump += bz2.compress(content.encode("utf-8"))
+
+        dump += bz2.compress(b"</mediawiki>")
+        return dump, bz2.compress(index.encode("utf-8"))
+
+    return _craft_multistream_data
+
+
 @pytest.fixture(scope="session")
 def page() -> Callable[[str, str], str]:
     """Return the Wikicode of a word stored into "data/LOCALE/WORD.wiki"."""
@@ -9,7 +9,7 @@
 import responses
 
 from wikidict import download
-from wikidict.constants import BASE_URL, DUMP_URL
+from wikidict.constants import BASE_URL, DUMP_URL, DUMP_URL_MULTISTREAM, DUMP_URL_MULTISTREAM_INDEX
 
 WIKTIONARY_INDEX = """<html>
 <head><title>Index of /frwiktionary/</title></head>
@@ -36,6 +36,8 @@ def cleanup(folder: Path) -> None:
         file.unlink()
     for file in folder.glob("pages-*.xml.bz2"):
         file.unlink()
+    for file in folder.glob("pages-*.txt.bz2"):
+        file.unlink()
 
 
 @responses.activate
@@ -66,6 +68,69 @@ def test_simple(craft_data: Callable[[str], bytes]) -> None:
     assert pages_bz2.is_file()
 
 
+@responses.activate
+def test_stream(craft_data: Callable[[str], bytes]) -> None:
+    """It should download the Wiktionary dump file, and keep it compressed."""
+
+    output_dir = Path(os.environ["CWD"]) / "data" / "fr"
+
+    dump = DUMPS[-1]
+    pages_xml = output_dir / f"pages-{dump}.xml"
+    pages_bz2 = output_dir / f"pages-{dump}.xml.bz2"
+
+    # Clean-up before we start
+    cleanup(output_dir)
+
+    # List of requests responses to falsify:
+    #   - fetch_snapshots()
+    #   - fetch_pages()
+    responses.add(responses.GET, BASE_URL.format(locale="fr"), body=WIKTIONARY_INDEX)
+    responses.add(responses.GET, DUMP_URL.format(locale="fr", snapshot=dump), body=craft_data("fr"))
+
+    # Start the whole process
+    assert download.main("fr", stream=True) == 0
+
+    # Check that only the compressed file is created
+    assert not pages_xml.is_file()
+    assert pages_bz2.is_file()
+
+
+@responses.activate
+def test_multistream(craft_multistream_data: Callable[[str, int], tuple[bytes, bytes]]) -> None:
+    """It should download the Wiktionary multistream dump file, and its index, and keep them compressed."""
+
+    output_dir = Path(os.environ["CWD"]) / "data" / "fr"
+
+    dump = DUMPS[-1]
+    pages_xml = output_dir / f"pages-{dump}.xml"
+    pages_bz2 = output_dir / f"pages-{dump}.xml.bz2"
+    multistream = output_dir / f"pages-multistream-{dump}.xml.bz2"
+    multistream_index = output_dir / f"pages-multistream-index-{dump}.txt.bz2"
+
+    # Clean-up before we start
+    cleanup(output_dir)
+
+    # List of requests responses to falsify:
+    #   - fetch_snapshots()
+    #   - fetch_pages() for the index, and the dump
+    data, index = craft_multistream_data("fr", 3)
+    responses.add(responses.GET, BASE_URL.format(locale="fr"), body=WIKTIONARY_INDEX)
+    responses.add(responses.GET, DUMP_URL_MULTISTREAM_INDEX.format(locale="fr", snapshot=dump), body=index)
+    responses.add(responses.GET, DUMP_URL_MULTISTREAM.format(locale="fr", snapshot=dump), body=data)
+
+    # Start the whole process
+    assert download.main("fr", multistream=True) == 0
+
+    # Check that only multistream files are created
+    assert multistream.read_bytes() == data
+    assert multistream_index.read_bytes() == index
+    assert not pages_xml.is_file()
+    assert not pages_bz2.is_file()
+
+    # Clean-up to not interfere with next tests
+    cleanup(output_dir)
+
+
 @responses.activate
 def test_download_already_done(craft_data: Callable[[str], bytes]) -> None:
     """It should not download again a processed Wiktionary dump."""
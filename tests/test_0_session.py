@@ -0,0 +1,132 @@
+import socket
+from contextlib import closing
+from pathlib import Path
+from time import monotonic
+from unittest.mock import patch
+
+import pytest
+import requests
+import responses
+from urllib3.connection import HTTPSConnection
+from urllib3.exceptions import NameResolutionError
+
+from wikidict import session
+
+URL = "https://en.wiktionary.org/w/index.php?title=foo&action=raw"
+URL_BAR = "https://en.wiktionary.org/wiki/bar"
+
+
+@responses.activate
+def test_retries() -> None:
+    responses.add(responses.GET, URL, status=503, headers={"Retry-After": "0"})
+    responses.add(responses.GET, URL, status=429, headers={"Retry-After": "0"})
+    responses.add(responses.GET, URL, body="foo")
+
+    with session.Session() as http:
+        assert http.get(URL).text == "foo"
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_retries_exhausted() -> None:
+    responses.add(responses.GET, URL, status=500)
+    responses.add(responses.GET, URL_BAR, body=requests.ConnectionError())
+
+    with session.Session(max_retries=2, backoff=0.0) as http:
+        assert http.get(URL).status_code == 500
+        assert len(responses.calls) == 3
+
+        with pytest.raises(requests.ConnectionError):
+            http.get(URL_BAR)
+        assert len(responses.calls) == 6
+
+
+@responses.activate
+def test_no_retries() -> None:
+    responses.add(responses.GET, URL, status=404)
+
+    with session.Session() as http:
+        assert http.get(URL).status_code == 404
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_no_retries_post() -> None:
+    """Requests that may have been processed already are not sent again."""
+    responses.add(responses.POST, URL, status=503)
+    responses.add(responses.POST, URL_BAR, body=requests.ConnectionError())
+
+    with session.Session(backoff=0.0) as http:
+        assert http.post(URL).status_code == 503
+        with pytest.raises(requests.ConnectionError):
+            http.post(URL_BAR)
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_no_retries_name_resolution() -> None:
+    conn = HTTPSConnection("en.wiktionary.org")
+    error = NameResolutionError(conn.host, conn, socket.gaierror(-2, "Name or service not known"))
+    responses.add(responses.GET, URL, body=requests.ConnectionError(error))
+
+    with session.Session(backoff=0.0) as http, pytest.raises(requests.ConnectionError):
+        http.get(URL)
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_no_retries_when_turned_off() -> None:
+    responses.add(responses.GET, URL, status=503)
+
+    with (
+        patch.dict("os.environ", {"HTTP_MAX_RETRIES": "0"}),
+        session.Session(max_retries=session.get_max_retries()) as http,
+    ):
+        assert http.get(URL).status_code == 503
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_cache(tmp_path: Path) -> None:
+    def callback(request: requests.PreparedRequest) -> tuple[int, dict[str, str], str]:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return 304, {}, ""
+        return 200, {"ETag": '"v1"', "Content-Type": "text/plain; charset=utf-8"}, "Ça va ?"
+
+    responses.add_callback(responses.GET, URL, callback=callback)
+    responses.add(responses.GET, URL_BAR, body="bar")
+    file = tmp_path / "http-cache.sqlite"
+
+    with session.Session() as http:
+        # No cache, no revalidation
+        assert http.get(URL).status_code == 200
+        assert http.get(URL).status_code == 200
+
+        for _ in range(2):
+            with http.cached(file):
+                response = http.get(URL)
+                assert response.status_code == 200
+                assert response.text == "Ça va ?"
+
+                # Responses without validators are not cached
+                assert http.get(URL_BAR).text == "bar"
+            assert http.cache is None
+
+    statuses = [call.response.status_code for call in responses.calls if call.request.url == URL]  # type: ignore[union-attr]
+    assert statuses == [200, 200, 200, 304]
+    with closing(session.ResponseCache(file)) as cache:
+        assert cache.get(URL_BAR) is None
+
+
+def test_token_bucket() -> None:
+    bucket = session.TokenBucket(20.0, capacity=2)
+    start = monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert monotonic() - start >= 0.09
+
+
+def test_buckets_by_host() -> None:
+    with session.Session() as http:
+        assert http.get_bucket(URL) is http.get_bucket("https://en.wiktionary.org/w/api.php")
+        assert http.get_bucket(URL) is not http.get_bucket("https://fr.wiktionary.org/w/api.php")
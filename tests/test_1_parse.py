@@ -13,7 +13,7 @@ def test_simple(craft_data: Callable[[str], bytes]) -> None:
     output_dir = Path(os.environ["CWD"]) / "data" / "fr"
 
     # Delete an previously created file to cover the save() part
-    for file in output_dir.glob("data_wikicode-*.json"):
+    for file in output_dir.glob("data_wikicode-*.jsonl"):
         file.unlink()
 
     # Ensure there is data to process.
@@ -24,6 +24,102 @@ def test_simple(craft_data: Callable[[str], bytes]) -> None:
     assert parse.main("fr") == 0
 
 
+def test_streaming(craft_data: Callable[[str], bytes], tmp_path: Path) -> None:
+    """The BZ2 dump should give the same result as its uncompressed version."""
+    compressed = tmp_path / "pages-20201217.xml.bz2"
+    compressed.write_bytes(craft_data("fr"))
+    raw = tmp_path / "pages-20201217.xml"
+    raw.write_bytes(bz2.decompress(compressed.read_bytes()))
+
+    words = parse.process(compressed, "fr")
+    assert words
+    assert words == parse.process(raw, "fr")
+
+
+def test_streaming_early_stop(craft_data: Callable[[str], bytes], tmp_path: Path) -> None:
+    file = tmp_path / "pages-20201217.xml.bz2"
+    file.write_bytes(craft_data("fr"))
+
+    lines = parse.bz2_iter_lines(file, chunk_size=1)
+    assert next(lines).startswith("<mediawiki ")
+    lines.close()
+
+
+def test_streaming_corrupted_file(tmp_path: Path) -> None:
+    file = tmp_path / "pages-20201217.xml.bz2"
+    file.write_bytes(b"not a BZ2 file")
+
+    with pytest.raises(OSError):
+        list(parse.bz2_iter_lines(file))
+
+
+def test_get_latest_xml_file(tmp_path: Path) -> None:
+    assert parse.get_latest_xml_file(tmp_path) is None
+
+    (tmp_path / "pages-20250301.xml").touch()
+    (tmp_path / "pages-20250301.xml.bz2").touch()
+    assert parse.get_latest_xml_file(tmp_path) == tmp_path / "pages-20250301.xml"
+
+    # Not uncompressed, it will be streamed
+    (tmp_path / "pages-20250401.xml.bz2").touch()
+    assert parse.get_latest_xml_file(tmp_path) == tmp_path / "pages-20250401.xml.bz2"
+
+
+def test_multistream(
+    craft_data: Callable[[str], bytes],
+    craft_multistream_data: Callable[[str, int], tuple[bytes, bytes]],
+    tmp_path: Path,
+) -> None:
+    """The multistream dump should give the same result as the regular one."""
+    file = tmp_path / "pages-20201217.xml.bz2"
+    file.write_bytes(craft_data("fr"))
+    expected = parse.process(file, "fr")
+    assert expected
+
+    dump, index = craft_multistream_data("fr", 3)
+    multistream = tmp_path / "pages-multistream-20201217.xml.bz2"
+    multistream.write_bytes(dump)
+    multistream_index = tmp_path / "pages-multistream-index-20201217.txt.bz2"
+    multistream_index.write_bytes(index)
+
+    offsets = parse.read_multistream_index(multistream_index)
+    assert len(offsets) == len(set(offsets)) > 1
+    assert offsets == sorted(offsets)
+
+    for streams_per_task in (1, 2, len(offsets)):
+        words = parse.process_multistream(
+            multistream, multistream_index, "fr", workers=2, streams_per_task=streams_per_task
+        )
+        assert words == expected
+
+
+def test_get_latest_multistream_files(tmp_path: Path) -> None:
+    assert parse.get_latest_multistream_files(tmp_path) is None
+
+    # The index is mandatory
+    (file := tmp_path / "pages-multistream-20250401.xml.bz2").touch()
+    assert parse.get_latest_multistream_files(tmp_path) is None
+
+    (index := tmp_path / "pages-multistream-index-20250401.txt.bz2").touch()
+    assert parse.get_latest_multistream_files(tmp_path) == (file, index)
+
+
+def test_main_multistream(craft_multistream_data: Callable[[str, int], tuple[bytes, bytes]], tmp_path: Path) -> None:
+    source_dir = tmp_path / "data" / "fr"
+    source_dir.mkdir(parents=True)
+    dump, index = craft_multistream_data("fr", 3)
+    (source_dir / "pages-multistream-20250401.xml.bz2").write_bytes(dump)
+    (source_dir / "pages-multistream-index-20250401.txt.bz2").write_bytes(index)
+
+    # An older regular dump should be ignored
+    (source_dir / "pages-20250301.xml").touch()
+
+    with patch.dict("os.environ", {"CWD": str(tmp_path)}):
+        assert parse.main("fr", workers=2) == 0
+
+    assert (source_dir / "fr" / "data_wikicode-20250401.jsonl").is_file()
+
+
 def test_no_xml_file() -> None:
     with patch.object(parse, "get_latest_xml_file", return_value=None):
         assert parse.main("fr") == 1
@@ -199,6 +295,44 @@ def test_parse_word_with_templates_lowercased(tmp_path: Path) -> None:
     assert "restaurang" in parse.process(file, "sv")
 
 
+def test_parse_word_only_keeps_head_sections(tmp_path: Path) -> None:
+    file = tmp_path / "page.xml"
+    file.write_text(
+        """\
+<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/" xml:lang="fr">
+<page>
+    <title>de</title>
+    <ns>0</ns>
+    <id>42</id>
+    <revision>
+        <id>42</id>
+        <model>wikitext</model>
+        <format>text/x-wiki</format>
+        <text bytes="202" xml:space="preserve">{{voir|De|dé}}
+
+== {{langue|en}} ==
+=== {{S|nom|en}} ===
+# Not French.
+
+== {{langue|fr}} ==
+=== {{S|préposition|fr}} ===
+# [[indiquer|Indique]] l’[[origine]].&lt;!-- == {{langue|es}} == --&gt;
+
+== {{langue|es}} ==
+=== {{S|préposition|es}} ===
+# Not French.
+</text>
+    </revision>
+</page>
+</mediawiki>
+"""
+    )
+
+    assert parse.process(file, "fr") == {
+        "de": "== {{langue|fr}} ==\n=== {{S|préposition|fr}} ===\n# [[indiquer|Indique]] l’[[origine]].\n\n"
+    }
+
+
 @pytest.mark.parametrize(
     "locale, lang_src, lang_dst",
     [
@@ -219,7 +353,7 @@ def test_sublang(locale: str, lang_src: str, lang_dst: str, tmp_path: Path) -> N
         assert source_dir == tmp_path / "data" / lang_src
 
         output_file = parse.get_output_file(source_dir, lang_src, lang_dst, snapshot)
-        assert output_file == source_dir.parent / lang_dst / lang_src / f"data_wikicode-{snapshot}.json"
+        assert output_file == source_dir.parent / lang_dst / lang_src / f"data_wikicode-{snapshot}.jsonl"
 
         with (
             patch.object(parse, "get_source_dir") as mocked_gsd,
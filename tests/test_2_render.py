@@ -1,12 +1,12 @@
 import logging
 from collections.abc import Callable
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import call, patch
 
 import pytest
 from wikitextparser import Section
 
-from wikidict import render
+from wikidict import lang, render, render_cache
 from wikidict.stubs import Word
 
 
@@ -28,6 +28,85 @@ def test_empty_json_file(tmp_path: Path) -> None:
         assert render.main("fr") == 1
 
 
+def test_render_as_words_come(page: Callable[[str, str], str]) -> None:
+    in_words = {word: page(word, "fr") for word in ("π", "42")}
+    with patch.object(render, "CHUNK_SIZE", 1):
+        assert render.render(iter(in_words.items()), "fr", 2) == render.render(in_words, "fr", 1)
+
+
+def test_render_cache(page: Callable[[str, str], str], tmp_path: Path) -> None:
+    in_words = {word: page(word, "fr") for word in ("π", "42")}
+    in_words["empty"] = "== {{langue|en}} ==\n=== {{S|nom|en}} ===\n# Not French."
+    expected = render.render(in_words, "fr", 1)
+    assert set(expected) == {"π", "42"}
+
+    with render_cache.RenderCache(tmp_path, "fr", "fr") as cache:
+        assert render.render(in_words, "fr", 1, cache=cache) == expected
+        assert not cache.keys
+    assert [file.name for file in tmp_path.iterdir()] == [cache.file.name]
+
+    # Unchanged words are not rendered again, even those without definitions
+    in_words["42"] = in_words["42"].replace("[[quarante-deux|Quarante-deux]]", "Quarante-trois")
+    with render_cache.RenderCache(tmp_path, "fr", "fr") as cache:
+        cached, missing = cache.load(in_words)
+    assert sorted(word for word, _, _ in cached) == ["empty", "π"]
+    assert list(missing) == ["42"]
+
+    with render_cache.RenderCache(tmp_path, "fr", "fr") as cache:
+        words = render.render(in_words, "fr", 1, cache=cache)
+    assert words["π"] == expected["π"]
+    assert words["42"].definitions["Nom"][0] == "Quarante-trois."
+
+    # The cache is discarded as soon as the rendering code changes
+    with patch.object(render_cache.utils, "KEEP_UNFINISHED", True):
+        with render_cache.RenderCache(tmp_path, "fr", "fr") as new_cache:
+            cached, missing = new_cache.load(in_words)
+        assert not cached
+        assert missing == in_words
+    assert [file.name for file in tmp_path.iterdir()] == [new_cache.file.name]
+
+
+def test_render_cache_missing_templates(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    """Templates statistics of cached words are reported again."""
+    in_words = {"a": "== {{langue|fr}} ==\n=== {{S|lettre|fr}} ===\n'''a'''\n# Lettre {{unknown-1|0061}}.\n"}
+
+    with patch.object(render.utils, "KEEP_UNFINISHED", True):
+        for _ in range(2):
+            caplog.clear()
+            with render_cache.RenderCache(tmp_path, "fr", "fr") as cache:
+                assert render.render(in_words, "fr", 1, cache=cache)
+            assert "Missing `unknown-1` template support (1 times), example in: `a`" in caplog.messages
+
+
+def test_render_cache_cached_values(tmp_path: Path) -> None:
+    """Only words using a formula, or a place, whose cached value changed are rendered again."""
+    in_words = {
+        "a": "== {{langue|fr}} ==\n=== {{S|nom|fr}} ===\n'''a'''\n# Lettre <math>V^n</math>.\n",
+        "b": "== {{langue|fr}} ==\n=== {{S|nom|fr}} ===\n'''b'''\n# Lettre.\n",
+        "c": "==English==\n===Proper noun===\n'''c'''\n# {{place|en|town|s/Ohio}}.\n",
+    }
+    with render_cache.RenderCache(tmp_path, "fr", "fr") as cache:
+        assert "<svg" in render.render(in_words, "fr", 1, cache=cache)["a"].definitions["Nom"][0]
+
+    with (
+        patch.object(render_cache.svg, "get", return_value="<svg>new</svg>"),
+        render_cache.RenderCache(tmp_path, "fr", "fr") as cache,
+    ):
+        cached, missing = cache.load(in_words)
+    assert sorted(word for word, _, _ in cached) == ["b", "c"]
+    assert list(missing) == ["a"]
+
+    # Places are part of the key only for locales retrieving them from the cache
+    key_en, key_fr = (render_cache.get_key("c", in_words["c"], locale) for locale in ("en", "fr"))
+    with patch.object(render_cache.place.CACHE, "get", return_value="A new town"):
+        assert render_cache.get_key("c", in_words["c"], "en") != key_en
+        assert render_cache.get_key("c", in_words["c"], "fr") == key_fr
+
+
+def test_render_cache_fingerprint_files() -> None:
+    assert all(file.is_file() for file in render_cache.get_files("fr", "fro"))
+
+
 def test_render_word(page: Callable[[str, str], str]) -> None:
     assert render.render_word(["π", page("π", "fr")], {}, "fr")
 
@@ -49,6 +128,22 @@ def test_render_word_with_empty_subdefinition(page: Callable[[str, str], str]) -
     }
 
 
+@pytest.mark.parametrize(
+    "locale",
+    sorted(locale for locale in lang.head_sections if (Path(__file__).parent / "data" / locale).is_dir()),
+)
+def test_parse_word_head_sections_slicing(locale: str) -> None:
+    """Slicing pages before parsing them must not change anything, even for pages of other locales."""
+    files = sorted((Path(__file__).parent / "data").glob("*/*.wiki"))
+    with_slicing = [render.parse_word(file.stem, file.read_text(encoding="utf-8"), locale) for file in files]
+
+    with patch.object(render.utils, "slice_head_sections", lambda code, _: code):
+        without_slicing = [render.parse_word(file.stem, file.read_text(encoding="utf-8"), locale) for file in files]
+
+    assert with_slicing == without_slicing
+    assert any(word.definitions for word in with_slicing)
+
+
 def test_find_section_definitions_and_es_replace_defs_list_with_numbered_lists() -> None:
     section = Section(
         "=== {{sustantivo propio|es|género=femenino}} ===\n"
@@ -180,10 +275,11 @@ def test_sublang(locale: str, lang_src: str, lang_dst: str, tmp_path: Path) -> N
         assert source_dir == tmp_path / "data" / lang_dst / lang_src
 
         output_file = render.get_output_file(source_dir, snapshot)
-        assert output_file == source_dir / f"data-{snapshot}.json"
+        assert output_file == source_dir / f"data-{snapshot}.jsonl"
 
         with (
             patch.object(render, "get_latest_json_file") as mocked_gljf,
+            patch.object(render, "prefetch") as mocked_p,
             patch.object(render, "load") as mocked_l,
             patch.object(render, "render") as mocked_r,
             patch.object(render, "save") as mocked_s,
@@ -194,6 +290,8 @@ def test_sublang(locale: str, lang_src: str, lang_dst: str, tmp_path: Path) -> N
 
             render.main(locale, workers=1)
             mocked_gljf.assert_called_once_with(source_dir)
-            mocked_l.assert_called_once_with(pages)
-            mocked_r.assert_called_once_with(words, locale, 1)
+            assert mocked_l.call_args_list == [call(pages), call(pages)]
+            mocked_p.assert_called_once_with(words, lang_src)
+            mocked_r.assert_called_once_with(words, locale, 1, cache=mocked_r.call_args.kwargs["cache"])
+            assert isinstance(mocked_r.call_args.kwargs["cache"], render_cache.RenderCache)
             mocked_s.assert_called_once_with(output_file, words)
@@ -1,18 +1,95 @@
+import json
+import subprocess
+import sys
+import threading
+from collections import defaultdict
+from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
 from unittest.mock import patch
+from urllib.parse import parse_qs
 
 import pytest
 import responses
 
-from wikidict import constants, utils
+from wikidict import caches, constants, formulas, lang, place, svg, utils
+
+SVG_NS = '<svg xmlns="http://www.w3.org/2000/svg">'
+
+
+class MathoidStandIn(BaseHTTPRequestHandler):
+    """A local Mathoid REST API: the SVG of a formula contains the formula itself, "bad" ones are rejected."""
+
+    def do_POST(self) -> None:
+        formula = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["q"]
+        if "bad" in formula:
+            self.send_error(400)
+            return
+        self.send_response(200)
+        self.send_header("x-resource-location", formula.encode().hex())
+        self.end_headers()
+        self.wfile.write(b'{"success": true}')
+
+    def do_GET(self) -> None:
+        formula = bytes.fromhex(self.path.rsplit("/", 1)[-1]).decode()
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(f"{SVG_NS}\n<title>{formula}</title>\n<text>{formula}</text>\n</svg>".encode())
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class MediaWikiStandIn(BaseHTTPRequestHandler):
+    """A local MediaWiki API, parsing templates into italic text, batches with a "bad" template are rejected."""
+
+    requests: list[str] = []
+
+    def do_POST(self) -> None:
+        text = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())["text"][0]
+        self.requests.append(text)
+        if "bad" in text:
+            self.send_error(400)
+            return
+        html = "\n".join(
+            f"<p>{paragraph.replace('{{', '<i>').replace('}}', '</i>')}\n</p>" for paragraph in text.split("\n\n")
+        )
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(json.dumps({"parse": {"text": {"*": f'<div class="mw-parser-output">{html}</div>'}}}).encode())
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def serve(handler: type[BaseHTTPRequestHandler]) -> Generator[str]:
+    with ThreadingHTTPServer(("127.0.0.1", 0), handler) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_port}"
+        server.shutdown()
+        thread.join()
+
+
+@pytest.fixture
+def mathoid_url() -> Generator[str]:
+    yield from serve(MathoidStandIn)
+
+
+@pytest.fixture
+def mediawiki_url() -> Generator[str]:
+    MediaWikiStandIn.requests = []
+    yield from serve(MediaWikiStandIn)
 
 
 @responses.activate
-def test_formula_to_svg(caplog: pytest.LogCaptureFixture) -> None:
+def test_render_formula() -> None:
     formula_hash = "1b3c657d9bf9ae776f50d0b36ae0b1041abfe45d"
 
     responses.add(
         responses.POST,
-        constants.WIKIMEDIA_URL_MATH_CHECK.format(type="chem"),
+        constants.WIKIMEDIA_URL_MATH_CHECK.format(base_url=constants.WIKIMEDIA_URL_BASE, type="chem"),
         headers={"x-resource-location": formula_hash},
         json={
             "success": True,
@@ -24,25 +101,214 @@ def test_formula_to_svg(caplog: pytest.LogCaptureFixture) -> None:
     )
     responses.add(
         responses.GET,
-        constants.WIKIMEDIA_URL_MATH_RENDER.format(format="svg", hash=formula_hash),
+        constants.WIKIMEDIA_URL_MATH_RENDER.format(
+            base_url=constants.WIKIMEDIA_URL_BASE, format="svg", hash=formula_hash
+        ),
         body="<svg></svg>",
     )
 
-    assert utils.formula_to_svg("C10H14N2O4", cat="chem").startswith("<svg")
+    assert utils.render_formula("C10H14N2O4", cat="chem") == "<svg></svg>"
 
-    with patch.dict("os.environ", {"FORCE_FORMULA_RENDERING": "1"}):
-        assert utils.formula_to_svg("C10H14N2O4", cat="chem").startswith("<svg")
 
+@pytest.fixture
+def cache_path(tmp_path: Path) -> Generator[Path]:
+    """Compressed caches, and their databases, are kept into `tmp_path`."""
+    with (
+        patch.object(caches, "CACHE_PATH", tmp_path),
+        patch.object(caches, "get_file", lambda kind: tmp_path / f"{kind}.sqlite"),
+    ):
+        yield tmp_path
 
-@responses.activate
-def test_convert_chem_error(caplog: pytest.LogCaptureFixture) -> None:
-    responses.add(responses.POST, constants.WIKIMEDIA_URL_MATH_CHECK.format(type="chem"), status=404)
-    utils.convert_chem("bad formula", "word")
+
+@pytest.fixture
+def svg_cache(cache_path: Path) -> Generator[caches.Cache]:
+    """An empty SVG cache."""
+    caches.save_cache_file("svg", {})
+    with caches.Cache("svg") as cache, patch.object(svg, "CACHE", cache):
+        yield cache
+
+
+def test_cache(cache_path: Path) -> None:
+    caches.save_cache_file("places", {"b": "2", "a": "1"})
+    with caches.Cache("places") as cache:
+        assert cache.get("a") == "1"
+        assert cache.get("c") == ""
+        assert (cache_path / "places.sqlite").is_file()
+
+        # Set entries are kept in memory only, saved ones are appended to the database
+        cache["c"] = "3"
+        cache["d"] = "4"
+        cache.save({"a": "0", "d": "4"})
+        assert cache.added == {"c": "3"}
+        assert list(cache.items()) == [("c", "3"), ("a", "0"), ("b", "2"), ("d", "4")]
+        assert caches.load_cache_file("places") == {"a": "0", "b": "2", "d": "4"}
+
+    # The compressed file is left untouched, when it changes, the database is updated, keeping saved entries
+    caches.expand_cache_file("places", {"b": "1", "e": "5"})
+    assert caches.load_cache_file("places") == {"a": "1", "b": "1", "d": "4", "e": "5"}
+
+
+def test_formula_to_svg(svg_cache: caches.Cache) -> None:
+    """SVG are optimized only once."""
+    svg_raw = f"{SVG_NS}\n<title>x</title>\n<text>x</text>\n</svg>"
+    svg_optimized = f"{SVG_NS}<text>x</text></svg>\n"
+    svg_cache.save({"x": svg_raw})
+
+    with patch.dict(svg.SCOUR_STATS, {"calls": 0}):
+        assert utils.formula_to_svg("x") == svg_optimized
+        assert utils.formula_to_svg("x") == svg_optimized
+        assert svg_cache.added == {"x": svg_optimized}
+        assert svg.SCOUR_STATS["calls"] == 1
+
+
+def test_svg_migrate(svg_cache: caches.Cache) -> None:
+    svg_optimized = f"{SVG_NS}<text>x</text></svg>\n"
+    svg_cache.save({"x": f"{SVG_NS}\n<title>x</title>\n<text>x</text>\n</svg>", "y": svg_optimized})
+
+    assert svg.migrate() == 1
+    assert caches.load_cache_file("svg") == {"x": svg_optimized, "y": svg_optimized}
+    assert svg.migrate() == 0
+
+
+def test_prefetch_formulas(svg_cache: caches.Cache, mathoid_url: str, caplog: pytest.LogCaptureFixture) -> None:
+    pages = [
+        ("a", "# <math>a^2</math>, et <chem>H2O</chem>."),
+        ("b", "# <math display=block>a^2</math>, <math>a^2 +\n b^2</math>, et <math>bad</math>."),
+        ("c", "# Sans formule."),
+    ]
+    svg_cache.save({"b^2": "<svg/>\n"})
+
+    assert formulas.prefetch(pages, base_url=mathoid_url) == 3
+    assert "ERROR rendering the 'bad' formula" in caplog.messages
+    assert caches.load_cache_file("svg") == {
+        "H2O": f"{SVG_NS}<text>\\ce{{H2O}}</text></svg>\n",
+        "a^2": f"{SVG_NS}<text>a^2</text></svg>\n",
+        "a^2 + b^2": f"{SVG_NS}<text>a^2 + b^2</text></svg>\n",
+        "b^2": "<svg/>\n",
+    }
+
+    # Words are then rendered without any network I/O
+    assert utils.process_templates("a", pages[0][1], "fr").count("<svg") == 2
+    assert formulas.prefetch(pages[:1], base_url=mathoid_url) == 0
+
+    # Formulas are rendered again when asked, only in memory when not saved
+    with patch.dict("os.environ", {"FORCE_FORMULA_RENDERING": "1", "MATHOID_URL": mathoid_url}):
+        assert formulas.prefetch(pages[:1], save=False) == 2
+    assert f"[new SVG] python add-to-cache.py svg 'a^2' '{SVG_NS}<text>a^2</text></svg>\\n'" in caplog.messages
+    assert sorted(svg_cache.added) == ["H2O", "a^2"]
+
+
+def test_prefetch_places(mediawiki_url: str, cache_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    pages = [
+        ("a", "# {{place|en|city|s/Texas}}.\n# {{place|en|town|s/Texas}}."),
+        ("b", "# {{place|en|city|s/Texas}}, {{place|en|bad}}, {{place|en|town|s/Ohio}}, {{place|en|city|s/Utah}}."),
+    ]
+    caches.save_cache_file("places", {"{{place|en|town|s/Ohio}}": "A town in Ohio"})
+    with caches.Cache("places") as cache, patch.object(place, "CACHE", cache):
+        assert place.prefetch(pages, "fr", url=mediawiki_url) == 0
+        assert place.prefetch(pages, "en", url=mediawiki_url, batch_size=2, interval=0) == 2
+        assert "ERROR retrieving 2 places, starting with '{{place|en|bad}}'" in caplog.messages
+        assert sorted(MediaWikiStandIn.requests) == [
+            "{{place|en|bad}}\n\nwikidict-place-separator\n\n{{place|en|city|s/Texas}}",
+            "{{place|en|city|s/Utah}}\n\nwikidict-place-separator\n\n{{place|en|town|s/Texas}}",
+        ]
+        assert caches.load_cache_file("places") == {
+            "{{place|en|city|s/Utah}}": "<i>place|en|city|s/Utah</i>",
+            "{{place|en|town|s/Ohio}}": "A town in Ohio",
+            "{{place|en|town|s/Texas}}": "<i>place|en|town|s/Texas</i>",
+        }
+
+        # Templates are then rendered without any network I/O
+        assert place.get(["en", "town", "s/Texas"], defaultdict(str), "en") == "<i>place|en|town|s/Texas</i>"
+        assert len(MediaWikiStandIn.requests) == 2
+
+
+def test_formula_to_svg_not_prefetched(svg_cache: caches.Cache, mathoid_url: str) -> None:
+    """Formulas missed by the prefetching are rendered on demand, and kept in memory."""
+    with patch.dict("os.environ", {"MATHOID_URL": mathoid_url}):
+        assert utils.convert_math("c^2", "c") == f"{SVG_NS}<text>c^2</text></svg>\n"
+        assert utils.convert_chem("CO2", "c") == f"{SVG_NS}<text>\\ce{{CO2}}</text></svg>\n"
+    assert sorted(svg_cache.added) == ["CO2", "c^2"]
+
+
+def test_convert_chem_error(svg_cache: caches.Cache, mathoid_url: str, caplog: pytest.LogCaptureFixture) -> None:
+    with patch.dict("os.environ", {"MATHOID_URL": mathoid_url}):
+        assert utils.convert_chem("bad formula", "word") == "bad formula"
     assert caplog.records[0].getMessage() == "<chem> ERROR with 'bad formula' in [word]"
 
 
-@responses.activate
-def test_convert_math_error(caplog: pytest.LogCaptureFixture) -> None:
-    responses.add(responses.POST, constants.WIKIMEDIA_URL_MATH_CHECK.format(type="math"), status=404)
-    utils.convert_math("bad formula", "word")
+def test_convert_math_error(svg_cache: caches.Cache, mathoid_url: str, caplog: pytest.LogCaptureFixture) -> None:
+    with patch.dict("os.environ", {"MATHOID_URL": mathoid_url}):
+        assert utils.convert_math("bad formula", "word") == "bad formula"
     assert caplog.records[0].getMessage() == "<math> ERROR with 'bad formula' in [word]"
+
+
+def test_json_lines(tmp_path: Path) -> None:
+    file = tmp_path / "data.jsonl"
+    words = [("a", "== {{langue|fr}} ==\n# Lettre."), ("é", {"definitions": {"Nom": ["Lettre."]}})]
+    assert utils.write_json_lines(file, iter(words)) == 2
+    assert file.read_text(encoding="utf-8").splitlines()[1] == '["é", {"definitions": {"Nom": ["Lettre."]}}]'
+    assert list(utils.read_json_lines(file)) == words
+
+    # The former format is still supported
+    file.write_text('{\n    "a": "b"\n}', encoding="utf-8")
+    assert list(utils.read_json_lines(file)) == [("a", "b")]
+
+    file.write_text("", encoding="utf-8")
+    assert not list(utils.read_json_lines(file))
+
+
+def test_lang_lazy_loading() -> None:
+    """Only locales actually used are imported."""
+    code = "import sys; from wikidict import lang; lang.head_sections['fr']; print(*sorted(sys.modules))"
+    modules = subprocess.check_output([sys.executable, "-c", code], text=True).split()
+    assert [module for module in modules if module.count(".") == 2 and module.startswith("wikidict.lang.")] == [
+        "wikidict.lang.defaults",
+        "wikidict.lang.fr",
+    ]
+    assert lang.head_sections["fr"] == lang.head_sections.get("fr")
+    assert "fr" in lang.head_sections
+    assert "xx" not in lang.head_sections
+    assert len(lang.head_sections) == len(list(lang.head_sections)) > 1
+
+
+@pytest.mark.parametrize("locale", sorted(lang.templates_multi))
+def test_compile_templates_multi(locale: str) -> None:
+    funcs = utils.compile_templates_multi(locale)
+    assert funcs.keys() == lang.templates_multi[locale].keys()
+    assert all(callable(func) for func in funcs.values())
+
+
+@pytest.mark.parametrize(
+    "text, handled",
+    [
+        ("no template", True),
+        ("{{lien|terne|fr}} et {{lien|terne|fr}}", True),
+        ("{{flexion|{{lien|terne|fr}}}}", True),
+        ("{{fchim|OH|2|{{!}}OH|2}}", True),
+        ("{{foo {{lien|terne|fr}}", True),
+        ("{{lien|terne|fr}}}} {{", True),
+        ("{{{{lien|terne|fr}}}}", True),
+        # Ambiguous cases handled by the iterative approach
+        ("{{{a}}} {{lien|terne|fr}}", False),
+        ("{{unknown|{{lien|foo|fr}}}} {{unknown|foo}}", False),
+        ("{{lien|{{(}}|fr}}", False),
+        ("{{lien|terne|fr}} {{lien|{{lien|terne|fr}}|fr}}", False),
+    ],
+)
+@pytest.mark.parametrize("variant_only", [False, True])
+def test_expand_templates(text: str, handled: bool, variant_only: bool) -> None:
+    """The single-scan expansion must give the same results as the iterative one."""
+    all_templates: list[tuple[str, str, str]] = []
+    expected_all_templates: list[tuple[str, str, str]] = []
+    expected = utils.expand_templates_iteratively(
+        "foo", text, "fr", all_templates=expected_all_templates, variant_only=variant_only
+    )
+
+    expanded = utils.expand_templates("foo", text, "fr", all_templates=all_templates, variant_only=variant_only)
+    if handled:
+        assert expanded == expected
+        assert all_templates == expected_all_templates
+    else:
+        assert expanded is None
+        assert not all_templates
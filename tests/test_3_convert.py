@@ -1,19 +1,28 @@
+import bz2
+import gzip
+import hashlib
+import io
 import logging
 import os
 import shutil
 from copy import deepcopy
 from pathlib import Path
 from unittest.mock import patch
-from zipfile import ZipFile
+from zipfile import BadZipFile, ZipFile
 
+import idzip.compressor
 import mobi
 import pytest
 from marisa_trie import Trie
+from pyglossary.glossary_v2 import ConvertArgs, Glossary
 
-from wikidict import constants, convert
+from wikidict import constants, convert, lang, render
 from wikidict.constants import ASSET_CHECKSUM_ALGO
 from wikidict.stubs import Variants, Word, Words
 
+# Locales having test data
+LOCALES = sorted(locale for locale in lang.head_sections if (Path(__file__).parent / "data" / locale).is_dir())
+
 WORDS = {
     "empty": Word([], [], [], {}, []),
     "foo": Word(["pron"], ["gender"], ["etyl"], {"Noun": ["def 1", ("sdef 1",)]}, []),
@@ -259,6 +268,8 @@ def test_no_json_file() -> None:
         (convert.DictFileFormat, "dict-fr-fr-noetym.df", False),
         (convert.KoboFormat, "dicthtml-fr-fr.zip", True),
         (convert.KoboFormat, "dicthtml-fr-fr-noetym.zip", False),
+        (convert.StarDictFormat, "dict-fr-fr.zip", True),
+        (convert.StarDictFormat, "dict-fr-fr-noetym.zip", False),
     ],
 )
 def test_generate_primary_dict(formatter: type[convert.BaseFormat], filename: str, include_etymology: bool) -> None:
@@ -286,8 +297,6 @@ def test_generate_primary_dict(formatter: type[convert.BaseFormat], filename: st
         (convert.DictOrgFormat, "dictorg-fr-fr-noetym.zip", False),
         (convert.MobiFormat, "dict-fr-fr.mobi", True),
         (convert.MobiFormat, "dict-fr-fr-noetym.mobi", False),
-        (convert.StarDictFormat, "dict-fr-fr.zip", True),
-        (convert.StarDictFormat, "dict-fr-fr-noetym.zip", False),
     ],
 )
 @pytest.mark.dependency(
@@ -310,6 +319,30 @@ def test_generate_secondary_dict(formatter: type[convert.BaseFormat], filename:
     assert (output_dir / filename).is_file()
 
 
+@pytest.mark.parametrize("words", [WORDS, {}])
+def test_bz2_dictfile_format(words: Words, tmp_path: Path) -> None:
+    """The DictFile is compressed into as many bz2 streams as there are blocks, and checksummed on the fly."""
+    convert.run_formatter(convert.DictFileFormat, "fr", tmp_path, words, convert.make_variants(words), "20250401")
+    with patch.object(convert.BZ2DictFileFormat, "block_size", 1_000):
+        convert.run_formatter(convert.BZ2DictFileFormat, "fr", tmp_path, {}, {}, "20250401")
+
+    dictfile = (tmp_path / "dict-fr-fr.df").read_bytes()
+    compressed = (tmp_path / "dict-fr-fr.df.bz2").read_bytes()
+    assert bz2.decompress(compressed) == dictfile
+
+    streams = 0
+    data = compressed
+    while data:
+        decompressor = bz2.BZ2Decompressor()
+        decompressor.decompress(data)
+        data = decompressor.unused_data
+        streams += 1
+    assert streams == max(1, -(-len(dictfile) // 1_000))
+
+    checksum = hashlib.new(ASSET_CHECKSUM_ALGO, compressed).hexdigest()
+    assert (tmp_path / f"dict-fr-fr.df.bz2.{ASSET_CHECKSUM_ALGO}").read_text() == f"{checksum} dict-fr-fr.df.bz2"
+
+
 FORMATTED_WORD_KOBO = """\
 <w><p><a name="Multiple Etymologies" /><b>Multiple Etymologies</b> pron <i>gender</i>.<br/><br/><b>Noun</b><ol><li>def 1</li><ol style="list-style-type:lower-alpha"><li>sdef 1</li></ol></ol><p>etyl 1</p><ol><li>setyl 1</li></ol><br/></p><var><variant name="multiple etymology"/></var></w>
 """
@@ -362,6 +395,23 @@ def test_word_rendering(
     assert content == expected
 
 
+@pytest.mark.parametrize("locale", LOCALES)
+def test_fast_renderers(locale: str, tmp_path: Path) -> None:
+    """Words rendered without Jinja are byte-identical to those rendered by Jinja."""
+    words = WORDS | WORDS_VARIANTS_ES
+    for file in sorted((Path(__file__).parent / "data" / locale).glob("*.wiki")):
+        # Only words with definitions, or variants, are added
+        render.render_word([file.stem, file.read_text(encoding="utf-8")], words, locale)
+    variants = convert.make_variants(words)
+
+    for formatter in (convert.KoboFormat, convert.DictFileFormat):
+        cls = formatter(locale, tmp_path, words, variants, "20250401", include_etymology=None)
+        with patch.dict(convert.FAST_RENDERERS, clear=True):
+            expected = [rendered for word in words for rendered in cls.handle_word_modes(word, words)]
+        assert [rendered for word in words for rendered in cls.handle_word_modes(word, words)] == expected
+        assert len(expected) > len(WORDS)
+
+
 WORDS_VARIANTS_FR = words = {
     "estre": Word(
         pronunciations=["\\ɛtʁ\\"],
@@ -421,6 +471,196 @@ def test_word_rendering(
 }
 
 
+@pytest.mark.parametrize("processes", [False, True])
+def test_distribute_workload(processes: bool, tmp_path: Path) -> None:
+    variants = convert.make_variants(WORDS)
+    (reference_dir := tmp_path / "reference").mkdir()
+    convert.run_formatter(convert.DictFileFormat, "fr", reference_dir, WORDS, variants, "20250401")
+
+    (output_dir := tmp_path / "output").mkdir()
+    convert.distribute_workload(
+        convert.get_primary_formatters(),
+        output_dir,
+        Path("data-20250401.jsonl"),
+        "fr",
+        WORDS,
+        variants,
+        processes=processes,
+    )
+
+    assert (output_dir / "dicthtml-fr-fr.zip").is_file()
+    assert (output_dir / "dict-fr-fr.df").read_bytes() == (reference_dir / "dict-fr-fr.df").read_bytes()
+
+
+@pytest.mark.parametrize(
+    "formatter, filename",
+    [
+        (convert.DictFileFormat, "dict-fr-fr{etym_suffix}.df"),
+        (convert.KoboFormat, "dicthtml-fr-fr{etym_suffix}.zip"),
+        (convert.StarDictFormat, "dict-fr-fr{etym_suffix}.zip"),
+    ],
+)
+def test_generate_primary_dict_single_pass(formatter: type[convert.BaseFormat], filename: str, tmp_path: Path) -> None:
+    """Dictionaries crafted from a single traversal of words are the same as those crafted one by one."""
+
+    def read(file: Path) -> dict[str, bytes]:
+        if file.suffix != ".zip":
+            return {file.name: file.read_bytes()}
+        with ZipFile(file) as fh:
+            return {
+                name: gzip.decompress(data) if name.endswith(".html") else data
+                for name in fh.namelist()
+                if (data := fh.read(name))
+            }
+
+    variants = convert.make_variants(WORDS)
+    for include_etymology in [None, False, True]:
+        (output_dir := tmp_path / str(include_etymology)).mkdir()
+        convert.run_formatter(
+            formatter,
+            "fr",
+            output_dir,
+            WORDS,
+            variants,
+            "20250401",
+            include_etymology=include_etymology,
+        )
+
+    for include_etymology, etym_suffix in [(False, constants.NO_ETYMOLOGY_SUFFIX), (True, "")]:
+        file = filename.format(etym_suffix=etym_suffix)
+        assert read(tmp_path / "None" / file) == read(tmp_path / str(include_etymology) / file)
+    assert read(tmp_path / "None" / filename.format(etym_suffix="")) != read(
+        tmp_path / "None" / filename.format(etym_suffix=constants.NO_ETYMOLOGY_SUFFIX)
+    )
+
+
+@pytest.mark.parametrize("locale", LOCALES)
+def test_stardict_same_as_pyglossary(locale: str, tmp_path: Path) -> None:
+    """StarDict files are the same as those PyGlossary crafts from the DictFile."""
+    words = WORDS | WORDS_VARIANTS_ES
+    for file in sorted((Path(__file__).parent / "data" / locale).glob("*.wiki")):
+        # Only words with definitions, or variants, are added
+        render.render_word([file.stem, file.read_text(encoding="utf-8")], words, locale)
+    variants = convert.make_variants(words)
+    for cls in (convert.DictFileFormat, convert.StarDictFormat):
+        convert.run_formatter(cls, locale, tmp_path, words, variants, "20250401")
+
+    formatter = convert.StarDictFormat(locale, tmp_path, words, variants, "20250401")
+    Glossary.init()
+    glos = Glossary()
+    glos.config = {"auto_sqlite": False}
+    glos.setInfo("description", formatter.description)
+    glos.setInfo("title", formatter.title())
+    glos.setInfo("website", formatter.website)
+    glos.setInfo("date", "2025-04-01")
+    writer_cls = glos.plugins["Stardict"].writerClass
+    with (
+        patch.object(writer_cls, "dictzipSynFile", False),
+        patch.object(writer_cls, "getBookname", lambda self: self._glos.getInfo("name")),
+    ):
+        glos.convert(
+            ConvertArgs(
+                inputFilename=str(tmp_path / f"dict-{locale}-{locale}.df"),
+                outputFilename=str(tmp_path / "pyglossary" / "dict-data.ifo"),
+                writeOptions={"dictzip": True, "sametypesequence": "h"},
+            )
+        )
+
+    expected = {
+        file.relative_to(tmp_path / "pyglossary").as_posix(): file.read_bytes()
+        for file in (tmp_path / "pyglossary").rglob("*")
+        if file.is_file()
+    }
+    # Only the modification time differs
+    expected["dict-data.dict.dz"] = expected["dict-data.dict.dz"][:4] + bytes(4) + expected["dict-data.dict.dz"][8:]
+    with ZipFile(tmp_path / f"dict-{locale}-{locale}.zip") as fh:
+        assert {name: fh.read(name) for name in fh.namelist()} == expected
+
+
+@pytest.mark.parametrize("size", [0, 1, convert.DICTZIP_CHUNK_LENGTH, 3 * convert.DICTZIP_CHUNK_LENGTH + 1])
+def test_dictzip(size: int) -> None:
+    data = os.urandom(size).hex().encode()[:size]
+    compressed = convert.dictzip(data, "dict-data.dict")
+    assert gzip.decompress(compressed) == data
+
+    output = io.BytesIO()
+    idzip.compressor.compress(io.BytesIO(data), size, output, "dict-data.dict", 0)
+    assert compressed == output.getvalue()
+
+
+def test_prepare_mobi_words() -> None:
+    """Words using the least-used characters are removed first, those used first being removed first on ties."""
+    long_word = "x" * 130
+    words = {word: WORDS["foo"] for word in ("aaa", "ab", "abc", "bd", long_word)}
+    original = words.copy()
+
+    assert convert.prepare_mobi_words("fr", words, max_chars=3) == {
+        "aaa": WORDS["foo"],
+        "ab": WORDS["foo"],
+        "x" * 127: WORDS["foo"],
+    }
+    assert list(convert.prepare_mobi_words("fr", words, max_chars=4)) == ["aaa", "ab", "bd", "x" * 127]
+    assert list(convert.prepare_mobi_words("fr:it", words, max_chars=3)) == ["aaa", "ab", "abc", "bd", "x" * 127]
+    assert words == original
+
+
+@pytest.mark.parametrize("zip_internals", [convert.ZIP_INTERNALS, ("_missing",)], ids=["raw", "fallback"])
+def test_kobo_format_incremental(zip_internals: tuple[str, ...], tmp_path: Path) -> None:
+    """HTML files whose content did not change since the previous build are copied from it, as is.
+    Without the needed `ZipFile` internals, they are decompressed, and compressed again, instead.
+    """
+
+    def read(file: Path) -> dict[str, bytes]:
+        with ZipFile(file) as fh:
+            assert fh.testzip() is None
+            return {name: fh.read(name) for name in fh.namelist()}
+
+    def build(output_dir: Path, words: Words) -> int:
+        with (
+            patch.object(convert, "ZIP_INTERNALS", zip_internals),
+            patch.object(convert.gzip, "compress", wraps=gzip.compress) as mocked_compress,
+        ):
+            convert.run_formatter(convert.KoboFormat, "fr", output_dir, words, convert.make_variants(words), "20250401")
+        return mocked_compress.call_count
+
+    (reference_dir := tmp_path / "reference").mkdir()
+    (output_dir := tmp_path / "output").mkdir()
+    file = "dicthtml-fr-fr.zip"
+    shards = build(output_dir, WORDS)
+    assert shards == len([name for name in read(output_dir / file) if name.endswith(".html")])
+    assert (output_dir / f"{file}.manifest.json").is_file()
+
+    # Nothing changed
+    assert build(output_dir, WORDS) == 0
+    build(reference_dir, WORDS)
+    assert read(output_dir / file) == read(reference_dir / file)
+
+    # A single word changed
+    words = WORDS | {"Multiple Etymologies": Word(["pron"], ["gender"], ["etyl"], {"Noun": ["new def 1"]}, [])}
+    assert build(output_dir, words) == 1
+    build(reference_dir, words)
+    assert read(output_dir / file) == read(reference_dir / file)
+
+    # The manifest does not match the ZIP
+    (output_dir / file).unlink()
+    shutil.copy(reference_dir / f"{file}.manifest.json", output_dir)
+    build(reference_dir, WORDS)
+    assert build(output_dir, WORDS) == shards
+    assert read(output_dir / file) == read(reference_dir / file)
+
+    # The previous build is corrupted, HTML files copied from it are checked too
+    with ZipFile(output_dir / file) as fh:
+        zinfo = fh.getinfo(next(name for name in fh.namelist() if name.endswith(".html")))
+        offset = zinfo.header_offset + len(zinfo.FileHeader()) + zinfo.compress_size // 2
+    with (output_dir / file).open(mode="r+b") as raw:
+        raw.seek(offset)
+        byte = raw.read(1)
+        raw.seek(offset)
+        raw.write(bytes([byte[0] ^ 0xFF]))
+    with pytest.raises(AssertionError if zip_internals == convert.ZIP_INTERNALS else BadZipFile):
+        build(output_dir, WORDS)
+
+
 def test_make_variants() -> None:
     assert convert.make_variants(WORDS_VARIANTS_FR) == {"suivre": ["suis"], "estre": ["suis"], "être": ["suis"]}
     assert convert.make_variants(WORDS_VARIANTS_ES) == {
@@ -430,6 +670,38 @@ def test_make_variants() -> None:
     }
 
 
+def test_resolve_variants() -> None:
+    resolved = convert.resolve_variants(WORDS_VARIANTS_FR, convert.make_variants(WORDS_VARIANTS_FR))
+    assert resolved.expanded == {"suivre": ("suis",), "estre": ("suis",), "être": ("suis",)}
+    assert resolved.all == resolved.expanded
+    # Variants with a different prefix are not kept for Kobo
+    assert resolved.kobo == {"suivre": ("suis",), "estre": (), "être": ()}
+
+    # Only 1 redirection is followed, and only words with definitions are resolved
+    resolved = convert.resolve_variants(WORDS_VARIANTS_ES, convert.make_variants(WORDS_VARIANTS_ES))
+    assert resolved.expanded == {"gastar": ("gastado", "gastada")}
+    assert resolved.all == resolved.kobo == {"gastar": ("gastada", "gastado")}
+
+
+def test_finalize_variants() -> None:
+    variants = ["Foo ", "foo", "foo", "bar", "fo", "Foo"]
+    assert convert.finalize_variants("foo", variants) == ("fo", "Foo", "bar", "Foo ")
+    assert convert.finalize_variants("foo", variants, kobo=True) == ("fo", "foo")
+
+
+@pytest.mark.parametrize("formatter", [convert.DictFileFormat, convert.KoboFormat])
+def test_handle_word_leaves_words_untouched(formatter: type[convert.BaseFormat], tmp_path: Path) -> None:
+    words = deepcopy(WORDS_VARIANTS_ES)
+    variants = convert.make_variants(words)
+    expected = deepcopy((words, variants))
+    cls = formatter("es", tmp_path, words, variants, "20250322")
+
+    assert [list(cls.handle_word(word, words)) for word in words] == [
+        list(cls.handle_word(word, words)) for word in words
+    ]
+    assert (words, variants) == expected
+
+
 def test_kobo_format_variants_different_prefix_with_definition(tmp_path: Path) -> None:
     words = deepcopy(WORDS_VARIANTS_FR)
     words["suis"].definitions["Nom"] = ["Définition de 'suis'."]
@@ -632,6 +904,7 @@ def test_sublang(locale: str, lang_src: str, lang_dst: str, tmp_path: Path) -> N
         patch.object(convert, "get_latest_json_file") as mocked_gljf,
         patch.object(convert, "load") as mocked_l,
         patch.object(convert, "make_variants") as mocked_mv,
+        patch.object(convert, "resolve_variants") as mocked_rv,
         patch.object(convert, "distribute_workload") as mocked_dw,
         patch.object(convert, "run_mobi_formatter") as mocked_rmf,
     ):
@@ -644,11 +917,20 @@ def test_sublang(locale: str, lang_src: str, lang_dst: str, tmp_path: Path) -> N
         mocked_gljf.assert_called_once_with(source_dir)
         mocked_l.assert_called_once_with(pages)
         mocked_mv.assert_called_once_with(words)
+        mocked_rv.assert_called_once_with(words, variants)
 
         args = (source_dir / "output", pages, locale, words, variants)
+        resolved_variants = mocked_rv.return_value
+        mocked_dw.assert_any_call(
+            convert.get_primary_formatters(),
+            *args,
+            include_etymology=None,
+            processes=False,
+            resolved_variants=resolved_variants,
+        )
         for include_etymology in [False, True]:
-            mocked_dw.assert_any_call(convert.get_primary_formatters(), *args, include_etymology=include_etymology)
-            mocked_dw.assert_any_call(convert.get_secondary_formatters(), *args, include_etymology=False)
-            mocked_rmf.assert_any_call(*args, include_etymology=False)
-        assert mocked_dw.call_count == 4
-        assert mocked_rmf.call_count == 2
+            mocked_dw.assert_any_call(
+                convert.get_secondary_formatters(), *args, include_etymology=include_etymology, processes=False
+            )
+        mocked_rmf.assert_called_once_with(*args, include_etymology=None, resolved_variants=resolved_variants)
+        assert mocked_dw.call_count == 3
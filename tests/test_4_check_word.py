@@ -1,13 +1,11 @@
 from collections.abc import Callable
-from typing import Any
 from unittest.mock import patch
 
 import pytest
 import responses
-from requests.exceptions import RequestException
-from requests.models import Response
+from requests.exceptions import Timeout
 
-from wikidict import check_word, utils
+from wikidict import check_word, constants, utils
 from wikidict.lang import random_word_url
 
 # Word used in test_filter_html()
@@ -494,26 +492,22 @@ def test_check_highlighting(
         assert "\033[31m" in errors
 
 
-def test_get_url_content_timeout_error(monkeypatch: pytest.MonkeyPatch) -> None:
-    def get(*_: Any, **__: Any) -> None:
-        raise TimeoutError()
+@responses.activate
+def test_get_url_content_timeout_error() -> None:
+    responses.add(responses.GET, "https://example.org", body=Timeout())
 
-    monkeypatch.setattr("wikidict.check_word.SLEEP_TIME", 0.01)
-    monkeypatch.setattr("requests.get", get)
-    with pytest.raises(RuntimeError):
-        check_word.get_url_content("https://...")
+    with (
+        patch.multiple(constants.SESSION, max_retries=2, backoff=0.0),
+        pytest.raises(RuntimeError, match="Sorry, cannot fetch 'https://example.org'"),
+    ):
+        check_word.get_url_content("https://example.org")
+    assert len(responses.calls) == 3
 
 
-def test_get_url_content_too_many_requests_error(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    def get(*_: Any, **__: Any) -> None:
-        response = Response()
-        response.status_code = 429
-        response.headers["retry-after"] = "1"
-        raise RequestException(response=response)
-
-    monkeypatch.setattr("wikidict.check_word.SLEEP_TIME", 0.01)
-    monkeypatch.setattr("requests.get", get)
-    with pytest.raises(RuntimeError):
-        check_word.get_url_content("https://...")
+@responses.activate
+def test_get_url_content_too_many_requests_error() -> None:
+    responses.add(responses.GET, "https://example.org", status=429, headers={"Retry-After": "0"})
+
+    with patch.multiple(constants.SESSION, max_retries=2), pytest.raises(RuntimeError, match="429 Client Error"):
+        check_word.get_url_content("https://example.org")
+    assert len(responses.calls) == 3
@@ -4,10 +4,10 @@
 Usage:
     wikidict LOCALE
     wikidict LOCALE -h, --help
-    wikidict LOCALE --download
-    wikidict LOCALE --parse
+    wikidict LOCALE --download [--stream | --multistream]
+    wikidict LOCALE --parse [--workers=N]
     wikidict LOCALE --render [--workers=N]
-    wikidict LOCALE --convert
+    wikidict LOCALE --convert [--processes]
     wikidict LOCALE --check-words [--random] [--count=N] [--offset=M] [--input=FILENAME]
     wikidict LOCALE --check-word=WORD
     wikidict LOCALE --get-word=WORD [--raw]
@@ -16,8 +16,16 @@
 
 Options:
   --download                Retrieve the latest Wiktionary dump into "data/$LOCALE/pages-$DATE.xml".
-  --parse                   Parse and store raw Wiktionary data into "data/$LOCALE/data_wikicode-$DATE.json".
-  --render                  Render templates from raw data into "data/$LOCALE/data-$DATE.json".
+                            --stream            Keep the dump compressed into "data/$LOCALE/pages-$DATE.xml.bz2",
+                                                --parse will then uncompress it on-the-fly.
+                            --multistream       Retrieve the multistream dump, and its index, into
+                                                "data/$LOCALE/pages-multistream-$DATE.xml.bz2",
+                                                --parse will then spread its streams across several processes.
+  --parse                   Parse and store raw Wiktionary data into "data/$LOCALE/data_wikicode-$DATE.jsonl".
+                            --workers=N         Set the number of multiprocessing workers for a multistream dump,
+                                                defaults to the number of CPU in the system.
+  --render                  Render templates from raw data into "data/$LOCALE/data-$DATE.jsonl".
+                            Words of unchanged pages are reused from "data/$LOCALE/render-cache-$HASH.sqlite".
                             --workers=N         Set the number of multiprocessing workers,
                                                 defaults to the number of CPU in the system.
   --convert                 Convert rendered data to working dictionaries into several files:
@@ -26,6 +34,7 @@
                                 - "data/$LOCALE/dict-$LOCALE-$LOCALE.zip": StarDict format.
                                 - "data/$LOCALE/dicthtml-$LOCALE-$LOCALE.zip": Kobo format.
                                 - "data/$LOCALE/dictorg-$LOCALE-$LOCALE.zip": DICT.org format.
+                            --processes         Run formatters into separate processes rather than threads.
   --check-words             Render words, then compare with the rendering done on the Wiktionary to catch errors.
                             --random            Randomly if --random
                             --count=N           If -1 check all words [default: 100]
@@ -58,12 +67,12 @@ def main() -> int:
     if args["--download"]:
         from . import download
 
-        return download.main(args["LOCALE"])
+        return download.main(args["LOCALE"], stream=args["--stream"], multistream=args["--multistream"])
 
     if args["--parse"]:
         from . import parse
 
-        return parse.main(args["LOCALE"])
+        return parse.main(args["LOCALE"], workers=int(args.get("--workers") or 0))
 
     if args["--render"]:
         from . import render
@@ -73,7 +82,7 @@ def main() -> int:
     if args["--convert"]:
         from . import convert
 
-        return convert.main(args["LOCALE"])
+        return convert.main(args["LOCALE"], processes=args["--processes"])
 
     if args["--check-word"] is not None:
         from . import check_word
@@ -1,24 +1,139 @@
+"""
+Caches of data retrieved from Wikimedia APIs: SVG of formulas, and expanded `{{place}}` templates.
+
+Caches are shipped as compressed JSON files, alongside this module. On first use, each of them is turned into
+a SQLite database of sorted keys, in the data folder, opened read-only, and memory-mapped, by every process using it:
+nothing is loaded at import time, and new entries are appended without rewriting the whole file.
+"""
+
+from __future__ import annotations
+
+import hashlib
 import json
+import os
+import sqlite3
+from contextlib import closing
 from gzip import compress, decompress
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import TracebackType
 
 CACHE_PATH = Path(__file__).parent
 
+# Maximum number of bytes of a database to memory-map
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def get_source_file(kind: str) -> Path:
+    return CACHE_PATH / f"{kind}.gz"
+
+
+def get_file(kind: str) -> Path:
+    return Path(os.getenv("CWD", "")) / "data" / "caches" / f"{kind}.sqlite"
+
+
+class Cache:
+    """
+    Key-value store of a given kind, backed by its SQLite database.
+
+    Entries set on the store are kept in memory only, while saved ones are appended to the database.
+    The database connection is opened on first use, once per process, so that it is never shared with forked workers.
+    """
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.added: dict[str, str] = {}
+        self._con: sqlite3.Connection | None = None
+        self._pid = 0
+
+    def __enter__(self) -> Cache:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._con is None:
+            # Only the first process opening the database checks it is up-to-date, forked workers inherit that
+            build_cache_file(self.kind)
+        elif self._pid != os.getpid():
+            self._con.close()
+        else:
+            return self._con
+        self._con = sqlite3.connect(f"{get_file(self.kind).as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        self._con.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        self._pid = os.getpid()
+        return self._con
+
+    def close(self) -> None:
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+
+    def get(self, key: str, default: str = "") -> str:
+        if (value := self.added.get(key)) is not None:
+            return value
+        row = self._connection().execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        return str(row[0]) if row else default
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self.added[key] = value
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        yield from self.added.items()
+        for key, value in self._connection().execute("SELECT key, value FROM cache ORDER BY key"):
+            if key not in self.added:
+                yield key, value
+
+    def save(self, values: dict[str, str]) -> None:
+        """Append `values` to the database, replacing existing entries."""
+        self._connection()
+        with closing(sqlite3.connect(get_file(self.kind))) as con, con:
+            con.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?)", values.items())
+        for key in values:
+            self.added.pop(key, None)
+
+
+def build_cache_file(kind: str) -> None:
+    """Create the database of a given kind from its compressed JSON file, or update it when the file changed.
+    Entries appended to the database since are kept.
+    """
+    source = get_source_file(kind).read_bytes()
+    digest = hashlib.sha256(source).hexdigest()
+    file = get_file(kind)
+    file.parent.mkdir(exist_ok=True, parents=True)
+    with closing(sqlite3.connect(file, timeout=60)) as con, con:
+        con.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID")
+        con.execute("CREATE TABLE IF NOT EXISTS source (digest TEXT NOT NULL)")
+        if con.execute("SELECT 1 FROM source WHERE digest = ?", (digest,)).fetchone():
+            return
+        contents: dict[str, str] = json.loads(decompress(source))
+        con.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?)", sorted(contents.items()))
+        con.execute("DELETE FROM source")
+        con.execute("INSERT INTO source VALUES (?)", (digest,))
+
 
 def load_cache_file(kind: str) -> dict[str, str]:
-    file = CACHE_PATH / f"{kind}.gz"
-    contents: dict[str, str] = json.loads(decompress(file.read_bytes()))
-    return contents
+    with closing(Cache(kind)) as cache:
+        return dict(cache.items())
 
 
 def expand_cache_file(kind: str, values: dict[str, str]) -> None:
-    contents = load_cache_file(kind)
+    contents: dict[str, str] = json.loads(decompress(get_source_file(kind).read_bytes()))
     contents |= values
     save_cache_file(kind, contents)
 
 
 def save_cache_file(kind: str, contents: dict[str, str]) -> None:
-    file = CACHE_PATH / f"{kind}.gz"
+    file = get_source_file(kind)
     file.write_bytes(
         compress(
             json.dumps(
@@ -8,13 +8,12 @@
 import urllib.parse
 import warnings
 from functools import partial
-from time import sleep
 from typing import TYPE_CHECKING
 
 from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning, NavigableString
 from requests.exceptions import RequestException
 
-from . import constants, utils
+from . import constants, formulas, utils
 from .render import parse_word
 from .user_functions import color, int_to_roman
 
@@ -32,10 +31,6 @@
 _replace_noisy_chars = re.compile(r"[\s\u200a\u200b\u200e]").sub
 no_spaces = partial(_replace_noisy_chars, "")
 
-# Retry mechanism
-MAX_RETRIES = 5  # count
-SLEEP_TIME = 5  # time, seconds
-
 log = logging.getLogger(__name__)
 
 
@@ -374,34 +369,23 @@ def craft_url(word: str, locale: str, *, raw: bool = False) -> str:
 
 
 def get_url_content(url: str) -> str:
-    """Fetch given *url* content with retries mechanism."""
-    retry = 0
-    while retry < MAX_RETRIES:
-        try:
-            with constants.SESSION.get(url, timeout=10) as req:
-                req.raise_for_status()
-                return req.text
-        except TimeoutError:
-            sleep(SLEEP_TIME)
-            retry += 1
-        except RequestException as err:
-            wait_time = 1
-            resp = err.response
-            if resp is not None:
-                if resp.status_code == 429:
-                    wait_time = int(resp.headers.get("retry-after") or "1")
-                elif resp.status_code == 404:
-                    log.error(err)
-                    return "404"
-            sleep(wait_time * SLEEP_TIME)
-            retry += 1
-    raise RuntimeError(f"Sorry, too many tries for {url!r}")
+    """Fetch given *url* content, retries are done by the HTTP session."""
+    try:
+        with constants.SESSION.get(url, timeout=10) as req:
+            req.raise_for_status()
+            return req.text
+    except RequestException as err:
+        if err.response is not None and err.response.status_code == 404:
+            log.error(err)
+            return "404"
+        raise RuntimeError(f"Sorry, cannot fetch {url!r}: {err}") from err
 
 
 def get_word(word: str, locale: str, *, all_templates: list[tuple[str, str, str]] | None = None) -> Word:
     """Get a *word* wikicode and parse it."""
     url = craft_url(word, utils.guess_lang_origin(locale), raw=True)
     html = get_url_content(url)
+    formulas.prefetch([(word, html)], save=False)
     return parse_word(word, html, locale, all_templates=all_templates)
 
 
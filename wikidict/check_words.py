@@ -6,7 +6,7 @@
 from functools import partial
 from pathlib import Path
 
-from . import check_word, render, utils
+from . import check_word, constants, render, session, utils
 
 log = logging.getLogger(__name__)
 
@@ -40,7 +40,7 @@ def get_words_to_tackle(
             return []
 
         log.info("Loading %s ...", file)
-        words = list(render.load(file).keys())
+        words = [word for word, _ in render.load(file)]
 
     if count == -1:
         count = len(words)
@@ -68,7 +68,8 @@ def main(locale: str, count: int, is_random: bool, offset: str, input_file: str)
     words = get_words_to_tackle(locale, count=count, is_random=is_random, offset=offset, input_file=input_file)
     all_templates: list[tuple[str, str, str]] = []
 
-    with ThreadPoolExecutor(max_workers=10) as pool:
+    # Unchanged pages are not fetched again from a run to another
+    with constants.SESSION.cached(session.get_cache_file()), ThreadPoolExecutor(max_workers=10) as pool:
         err = pool.map(
             partial(local_check, locale=locale, all_templates=all_templates),
             words,
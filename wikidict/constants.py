@@ -2,7 +2,7 @@
 
 from pathlib import Path
 
-import requests
+from .session import Session, get_max_retries
 
 # Dictionaries metadata
 PROJECT = "reader.dict"
@@ -12,13 +12,17 @@
 # Wiktionary dump URL
 BASE_URL = "https://dumps.wikimedia.org/{locale}wiktionary"
 DUMP_URL = f"{BASE_URL}/{{snapshot}}/{{locale}}wiktionary-{{snapshot}}-pages-articles.xml.bz2"
+DUMP_URL_MULTISTREAM = f"{BASE_URL}/{{snapshot}}/{{locale}}wiktionary-{{snapshot}}-pages-articles-multistream.xml.bz2"
+DUMP_URL_MULTISTREAM_INDEX = (
+    f"{BASE_URL}/{{snapshot}}/{{locale}}wiktionary-{{snapshot}}-pages-articles-multistream-index.txt.bz2"
+)
 
 # Wikimedia REST API
 WIKIMEDIA_HEADERS = {"User-Agent": WEBSITE}
 WIKTIONARY_URL_API = "https://{locale}.wiktionary.org/w/api.php"
 WIKIMEDIA_URL_BASE = "https://en.wikipedia.org/api/rest_v1"
-WIKIMEDIA_URL_MATH_CHECK = f"{WIKIMEDIA_URL_BASE}/media/math/check/{{type}}"
-WIKIMEDIA_URL_MATH_RENDER = f"{WIKIMEDIA_URL_BASE}/media/math/render/{{format}}/{{hash}}"
+WIKIMEDIA_URL_MATH_CHECK = "{base_url}/media/math/check/{type}"
+WIKIMEDIA_URL_MATH_RENDER = "{base_url}/media/math/render/{format}/{hash}"
 
 # Dictionary file suffix for etymology-free files
 NO_ETYMOLOGY_SUFFIX = "-noetym"
@@ -45,5 +49,5 @@
 KINDLEGEN_FILE = Path.home() / ".local" / "bin" / "kindlegen"
 
 # HTTP requests
-SESSION = requests.Session()
+SESSION = Session(max_retries=get_max_retries())
 SESSION.headers.update(WIKIMEDIA_HEADERS)
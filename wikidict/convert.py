@@ -2,35 +2,50 @@
 
 from __future__ import annotations
 
+import base64
 import bz2
 import gc
 import gzip
 import hashlib
 import json
 import logging
+import multiprocessing
 import os
+import re
 import shutil
+import struct
+import sys
 import threading
-from collections import defaultdict
-from copy import deepcopy
+import zlib
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from itertools import chain
+from multiprocessing.process import BaseProcess
 from pathlib import Path
 from time import monotonic
 from typing import TYPE_CHECKING
-from zipfile import ZIP_DEFLATED, ZipFile
+from zipfile import ZIP_DEFLATED, BadZipFile, ZipFile, ZipInfo
 
 from jinja2 import Template
 from marisa_trie import Trie
 from pyglossary.glossary_v2 import ConvertArgs, Glossary
 
-from . import constants, render, user_functions, utils
+from . import constants, render, utils
 from .stubs import Word
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import Callable, Generator, Iterable
+    from concurrent.futures import Future
     from typing import Any
 
-    from .stubs import Groups, Variants, Words
+    from .stubs import Definition, Groups, Variants, Words
+
+    # Digest of the content of an HTML file of a Kobo dictionary, and CRC of its compressed data
+    ShardInfo = tuple[str, int]
+    Manifest = dict[str, ShardInfo]
 
 # Kobo-related dictionaries
 # Note: We cannot remove the space before the slash in `<a name="{{ word }}" />` because
@@ -145,9 +160,117 @@
 """
 )
 
+
+def _definitions_html(pos_definitions: Iterable[Definition]) -> str:
+    """HTML of the definitions of a part of speech, as rendered by templates above."""
+    html: list[str] = []
+    for definition in pos_definitions:
+        if isinstance(definition, str):
+            html.append(f"<li>{definition}</li>")
+            continue
+        html.append('<ol style="list-style-type:lower-alpha">')
+        for sub_def in definition:
+            if isinstance(sub_def, str):
+                html.append(f"<li>{sub_def}</li>")
+            else:
+                html.append('<ol style="list-style-type:lower-roman">')
+                html.extend(f"<li>{sub_sub_def}</li>" for sub_sub_def in sub_def)
+                html.append("</ol>")
+        html.append("</ol>")
+    return "".join(html)
+
+
+def _etymologies_html(etymologies: Iterable[Definition]) -> str:
+    """HTML of etymologies, as rendered by templates above."""
+    html: list[str] = []
+    for etymology in etymologies:
+        if isinstance(etymology, str):
+            html.append(f"<p>{etymology}</p>")
+        else:
+            html.append("<ol>")
+            html.extend(f"<li>{sub_etymology}</li>" for sub_etymology in etymology)
+            html.append("</ol>")
+    if html:
+        html.append("<br/>")
+    return "".join(html)
+
+
+def render_word_kobo(
+    *,
+    word: str,
+    current_word: str,
+    definitions: Iterable[tuple[str, list[Definition]]],
+    pronunciation: str,
+    gender: str,
+    etymologies: list[Definition],
+    variants: Iterable[str],
+) -> str:
+    """Render a word exactly like `WORD_TPL_KOBO` does, without the Jinja runtime overhead."""
+    html = [f'<w><p><a name="{word}" /><b>{current_word}</b>{pronunciation}{gender}<br/><br/>']
+    html.extend(f"<b>{pos}</b><ol>{_definitions_html(pos_definitions)}</ol>" for pos, pos_definitions in definitions)
+    html.append(_etymologies_html(etymologies))
+    html.append("</p>")
+    if variants:
+        html.append("<var>")
+        html.extend(f'<variant name="{variant}"/>' for variant in variants)
+        html.append("</var>")
+    html.append("</w>\n")
+    return "".join(html)
+
+
+def render_word_dictfile(
+    *,
+    word: str,
+    current_word: str,
+    definitions: Iterable[tuple[str, list[Definition]]],
+    pronunciation: str,
+    gender: str,
+    etymologies: list[Definition],
+    variants: Iterable[str],
+) -> str:
+    """Render a word exactly like `WORD_TPL_DICTFILE` does, without the Jinja runtime overhead."""
+    html = [f"@ {word}"]
+    if pronunciation or gender:
+        html.append(f"\n:{pronunciation}{gender}")
+    html.extend(f"\n& {variant}" for variant in variants)
+    html.append("\n<html>")
+    html.extend(
+        f"<p><b>{pos}</b></p><ol>{_definitions_html(pos_definitions)}</ol>" for pos, pos_definitions in definitions
+    )
+    html.append(_etymologies_html(etymologies))
+    html.append("</html>\n\n")
+    return "".join(html)
+
+
+# Templates rendered by plain Python functions, rather than by Jinja, for speed
+FAST_RENDERERS: dict[Template, Callable[..., str]] = {
+    WORD_TPL_KOBO: render_word_kobo,
+    WORD_TPL_DICTFILE: render_word_dictfile,
+}
+
 # Threshold before issuing a warning to catch potentially problematic variants
 MAX_VARIANTS = 255
 
+# Size of the fixed part of the local header of a ZIP member
+ZIP_FILE_HEADER_SIZE = 30
+
+# Internals of `ZipFile` used to copy a member as is, see `copy_zip_member()`
+ZIP_INTERNALS = ("_lock", "_writecheck", "_didModify", "start_dir")
+
+# Limits of Mobi dictionaries: unique characters count, and word length
+MOBI_MAX_CHARS = 256
+MOBI_MAX_WORD_LENGTH = 127
+
+# Dictionaries without, and with, etymologies
+ETYMOLOGY_MODES = (False, True)
+
+# Inline images of definitions, saved as resources of StarDict dictionaries (like PyGlossary does)
+RE_INLINE_IMAGE = re.compile('src="(data:image/[^<>"]*)"').sub
+
+# Dictzip: gzip members, made of chunks compressed independently for random access (like dictzip, and idzip)
+DICTZIP_CHUNK_LENGTH = 58315
+DICTZIP_MAX_CHUNKS = (0xFFFF - 10) // 2
+
 log = logging.getLogger(__name__)
 
 
@@ -159,6 +282,18 @@ def filter(self, record: logging.LogRecord) -> bool:
         return not msg.startswith(("duplicate language", "Module 'lxml' not found"))
 
 
+@dataclass(slots=True)
+class ResolvedVariants:
+    """Final variants of words with definitions, computed once, and shared by all formatters."""
+
+    # Variants of variants without definitions included, not filtered
+    expanded: dict[str, tuple[str, ...]]
+    # Sorted variants, the word excluded
+    all: dict[str, tuple[str, ...]]
+    # Sorted variants sharing the prefix of their word, normalized
+    kobo: dict[str, tuple[str, ...]]
+
+
 class BaseFormat:
     """Base class for all dictionaries."""
 
@@ -172,14 +307,18 @@ def __init__(
         variants: Variants,
         snapshot: str,
         *,
-        include_etymology: bool = True,
+        include_etymology: bool | None = True,
+        resolved_variants: ResolvedVariants | None = None,
     ) -> None:
         self._lang_src, self._lang_dst = utils.guess_locales(locale)
         self.output_dir = output_dir
         self.words = words
         self.variants = variants
+        self._resolved_variants = resolved_variants
         self.snapshot = snapshot
         self.include_etymology = include_etymology
+        # `None` stands for both dictionaries, with and without etymologies, crafted from a single traversal of words
+        self.etymology_modes = ETYMOLOGY_MODES if include_etymology is None else (include_etymology,)
         self.start = monotonic()
         self.words_count = 0
         self.variants_count = 0
@@ -197,7 +336,8 @@ def description(self) -> str:
         return f"© {constants.PROJECT} {datetime.now(tz=UTC).year}"
 
     def id(self) -> str:
-        return f"{type(self).__name__} {self.effective_lang_src().upper()}-{self.effective_lang_dst().upper()} {'' if self.include_etymology else 'no'}etym"
+        etym = "+".join(f"{'' if include_etymology else 'no'}etym" for include_etymology in self.etymology_modes)
+        return f"{type(self).__name__} {self.effective_lang_src().upper()}-{self.effective_lang_dst().upper()} {etym}"
 
     def title(self) -> str:
         return constants.TITLE.format(
@@ -219,19 +359,41 @@ def effective_lang_src(self) -> str:
     def effective_lang_dst(self) -> str:
         return self._lang_dst
 
-    def dictionary_file(self, output_file: str) -> Path:
+    def dictionary_file(self, output_file: str, *, include_etymology: bool | None = None) -> Path:
+        if include_etymology is None:
+            include_etymology = self.include_etymology
         return self.output_dir / output_file.format(
             lang_src=self.effective_lang_src(),
             lang_dst=self.effective_lang_dst(),
-            etym_suffix="" if self.include_etymology else constants.NO_ETYMOLOGY_SUFFIX,
+            etym_suffix="" if include_etymology else constants.NO_ETYMOLOGY_SUFFIX,
         )
 
     def handle_word(self, word: str, words: Words) -> Generator[str]:
-        # Prevent storing variants definitions in DictFile & co
-        if (chosen_word := words[word]).is_variant and not chosen_word.definitions and not isinstance(self, KoboFormat):
+        for kwargs, etymologies in self.prepare_word(word, words):
+            yield self.render_word(self.template, etymologies=etymologies if self.include_etymology else [], **kwargs)
+
+    def handle_word_modes(self, word: str, words: Words) -> Generator[tuple[str, ...]]:
+        """Render a word once per etymology mode, ordered as `self.etymology_modes`.
+        Everything but the etymologies is computed once, and words without etymologies are rendered only once.
+        """
+        template = self.template
+        for kwargs, etymologies in self.prepare_word(word, words):
+            without_etymology = ""
+            rendered: list[str] = []
+            for include_etymology in self.etymology_modes:
+                if include_etymology and etymologies:
+                    rendered.append(self.render_word(template, etymologies=etymologies, **kwargs))
+                else:
+                    without_etymology = without_etymology or self.render_word(template, etymologies=[], **kwargs)
+                    rendered.append(without_etymology)
+            yield tuple(rendered)
+
+    def prepare_word(self, word: str, words: Words) -> Generator[tuple[dict[str, Any], list[Definition]]]:
+        """Yield the template arguments, but etymologies yielded apart, of each entry to render for a word."""
+        # Words without definitions are only useful to Kobo, as roots of their variants (cf [***])
+        if not (details := words[word]).definitions and not isinstance(self, KoboFormat):
             return
 
-        details = deepcopy(chosen_word)
         current_words = {word: details}
         guess_prefix = utils.guess_prefix
         word_group_prefix = guess_prefix(word)
@@ -251,69 +413,60 @@ def handle_word(self, word: str, words: Words) -> Generator[str]:
                 if root := self.words.get(variant):
                     current_words[variant] = root
 
+        resolved = self.resolved_variants
+        is_kobo = isinstance(self, KoboFormat)
         for current_word, current_details in sorted(current_words.items()):
             if not current_details.definitions:
                 continue
 
-            all_variants = self.variants
-            if variants := deepcopy(all_variants.get(current_word, [])):
-                # Add variants of empty* variant, only 1 redirection:
-                #   [ES] gastada* -> gastado* -> gastar --> (gastada, gastado) -> gastar
-                # Note: the process works backward: from gastar up to gastado up to gastada.
-                for variant in [*variants]:
-                    if (
-                        (wv := words.get(variant))
-                        and not wv.definitions
-                        and (new_variants := all_variants.get(variant))
-                    ):
-                        variants.extend(new_variants)
-
-                # Filter out variants being identical to the word (it happens when altering `current_words`, cf [***])
-                variants = [variant for variant in variants if variant not in {word, current_word}]
-
-                # Nullify variant words to prevent polluting the dictionary with duplicates
-                for variant in variants:
-                    words[variant].is_variant = True
-
-                if isinstance(self, KoboFormat):
-                    # Filter out variants with a different prefix that their word.
-                    # Plus, variants must be normalized by trimming whitespaces, and lowercasing it.
-                    current_word_group_prefix = guess_prefix(current_word)
-                    variants = [
-                        variant.lower().strip()
-                        for variant in variants
-                        if guess_prefix(variant) == current_word_group_prefix
-                    ]
-
-                if len(variants := list(set(variants))) > MAX_VARIANTS:
-                    log.warning("Word %r has too many variants (%d): %r", current_word, len(variants), variants)
-
-            yield self.render_word(
-                self.template,
-                word=word,
-                current_word=current_word,
-                definitions=current_details.definitions.items(),
-                pronunciation=utils.convert_pronunciation(current_details.pronunciations),
-                gender=utils.convert_gender(current_details.genders),
-                etymologies=current_details.etymology if self.include_etymology else [],
-                variants=sorted(variants, key=lambda s: (len(s), s)),
+            if current_word != word and guess_prefix(current_word) == word_group_prefix:
+                # Filter out variants being identical to the word (it happens when altering `current_words`, cf [***]).
+                # Otherwise, the word is already filtered out of Kobo variants, given its different prefix.
+                variants = finalize_variants(
+                    current_word,
+                    (variant for variant in resolved.expanded.get(current_word, ()) if variant != word),
+                    kobo=True,
+                )
+            else:
+                variants = (resolved.kobo if is_kobo else resolved.all).get(current_word, ())
+
+            self.variants_count += len(variants)
+            self.words_count += 1
+            yield (
+                {
+                    "word": word,
+                    "current_word": current_word,
+                    "definitions": current_details.definitions.items(),
+                    "pronunciation": utils.convert_pronunciation(current_details.pronunciations),
+                    "gender": utils.convert_gender(current_details.genders),
+                    "variants": variants,
+                },
+                current_details.etymology,
             )
 
+    @property
+    def resolved_variants(self) -> ResolvedVariants:
+        """Variants of words, resolved on first use unless shared by the caller."""
+        if self._resolved_variants is None:
+            self._resolved_variants = resolve_variants(self.words, self.variants)
+        return self._resolved_variants
+
     def process(self) -> None:
         raise NotImplementedError()
 
     def render_word(self, template: Template, **kwargs: Any) -> str:
-        self.variants_count += len(kwargs["variants"])
-        self.words_count += 1
+        if renderer := FAST_RENDERERS.get(template):
+            return renderer(**kwargs)
         return template.render(**kwargs)
 
-    def compute_checksum(self, file: Path) -> None:
-        checksum = hashlib.new(constants.ASSET_CHECKSUM_ALGO, file.read_bytes()).hexdigest()
+    def compute_checksum(self, file: Path, *, checksum: str = "") -> None:
+        """Write the checksum file of `file`, the `checksum` being computed unless already known."""
+        checksum = checksum or hashlib.new(constants.ASSET_CHECKSUM_ALGO, file.read_bytes()).hexdigest()
         checksum_file = file.with_suffix(f"{file.suffix}.{constants.ASSET_CHECKSUM_ALGO}")
         checksum_file.write_text(f"{checksum} {file.name}")
         log.info("[%s] Crafted %s (%s)", self.id(), checksum_file.name, checksum)
 
-    def summary(self, file: Path) -> None:
+    def summary(self, file: Path, *, checksum: str = "") -> None:
         if type(self).__name__ in {KoboFormat.__name__, DictFileFormat.__name__}:
             log.info(
                 "[%s] Effective words + variants: %s + %s => %s",
@@ -331,7 +484,7 @@ def summary(self, file: Path) -> None:
             f"{file.stat().st_size:,}",
             timedelta(seconds=monotonic() - self.start),
         )
-        self.compute_checksum(file)
+        self.compute_checksum(file, checksum=checksum)
 
         log.info(
             "[%s] Finished the conversion with %s words, and %s variants, as expected.",
@@ -352,12 +505,10 @@ def process(self) -> None:
         self.save()
 
     @staticmethod
-    def craft_index(wordlist: list[str], output_dir: Path) -> Path:
+    def craft_index(wordlist: list[str]) -> bytes:
         """Generate the special file "words" that is an index of all words."""
-        output = output_dir / "words"
-        trie = Trie(wordlist)
-        trie.save(output)
-        return output
+        index: bytes = Trie(wordlist).tobytes()
+        return index
 
     @staticmethod
     def make_groups(words: Words) -> Groups:
@@ -367,7 +518,7 @@ def make_groups(words: Words) -> Groups:
             groups[utils.guess_prefix(word)][word] = details
         return groups
 
-    def save(self) -> None:  # sourcery skip: extract-method
+    def save(self) -> None:
         """
         Format of resulting dicthtml-LOCALE-LOCALE.zip:
 
@@ -377,47 +528,118 @@ def save(self) -> None:  # sourcery skip: extract-method
             words
 
         Each word must be stored into the file {letter1}{letter2}.html (gzip content).
-        """
 
-        # Clean-up before we start
-        tmp_dir = self.output_dir / "tmp"
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        tmp_dir.mkdir()
+        HTML files are crafted in memory, one prefix after the other, and compressed by a pool of threads
+        (zlib releases the GIL) while next ones are crafted. They are then written into ZIPs, in order.
 
-        # Files to add to the final archive
-        to_compress: list[Path] = []
+        Digests of HTML files are kept into a manifest alongside the ZIP: at the next build, HTML files whose
+        content did not change are copied as is from the previous ZIP, rather than compressed again.
+        """
 
-        # First, create individual HTML files
+        files = [
+            self.dictionary_file(self.output_file, include_etymology=include_etymology)
+            for include_etymology in self.etymology_modes
+        ]
+        manifests: list[Manifest] = [{} for _ in files]
+        workers = os.cpu_count() or 1
+        pending: deque[tuple[str, list[Future[tuple[ShardInfo, bytes | None]]]]] = deque()
         wordlist: list[str] = []
-        for prefix, words in self.groups.items():
-            if html := self.save_html(prefix, words, tmp_dir):
-                to_compress.append(html)
-            wordlist.extend(words.keys())
-
-        # Then create the special "words" file
-        to_compress.append(self.craft_index(wordlist, tmp_dir))
-
-        # Finally, create the ZIP
-        final_file = self.dictionary_file(self.output_file)
-        with ZipFile(final_file, mode="w", compression=ZIP_DEFLATED) as fh:
-            # The ZIP's comment will serve as the dictionary signature
-            fh.comment = bytes(self.description, "utf-8")
+        reused = [0 for _ in files]
+
+        with ExitStack() as stack:
+            previous = [self.open_previous(stack, file) for file in files]
+            zips = [
+                stack.enter_context(ZipFile(self.tmp_file(file), mode="w", compression=ZIP_DEFLATED)) for file in files
+            ]
+            pool = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+
+            def write(max_pending: int) -> None:
+                while len(pending) > max_pending:
+                    prefix, compressing = pending.popleft()
+                    name = f"{prefix}.html"
+                    for idx, (fh, future) in enumerate(zip(zips, compressing)):
+                        info, data = future.result()
+                        manifests[idx][prefix] = info
+                        if data is None:
+                            copy_zip_member(previous[idx][0], fh, name)
+                            reused[idx] += 1
+                            continue
+                        fh.writestr(name, data)
+
+            # First, add individual HTML files
+            for prefix, words in self.groups.items():
+                if html := self.craft_html(words):
+                    pending.append(
+                        (
+                            prefix,
+                            [
+                                pool.submit(compress_html, content, self.previous_info(*previous[idx], prefix))
+                                for idx, content in enumerate(html)
+                            ],
+                        )
+                    )
+                    write(2 * workers)
+                wordlist.extend(words.keys())
+            write(0)
+
+            # Then add the special "words" file, shared by all etymology modes
+            index = self.craft_index(wordlist)
+            for fh in zips:
+                fh.writestr("words", index)
+
+                # Unrelated files, just for history
+                fh.writestr(constants.ZIP_WORDS_COUNT, str(self.words_count + self.variants_count))
+                fh.writestr(constants.ZIP_WORDS_SNAPSHOT, self.snapshot)
+
+                # The ZIP's comment will serve as the dictionary signature
+                fh.comment = bytes(self.description, "utf-8")
+
+        for file, manifest, count in zip(files, manifests, reused):
+            # Check the ZIP validity, HTML files copied from the previous build included
+            # testzip() returns the name of the first corrupt file, or None
+            with ZipFile(self.tmp_file(file)) as fh:
+                assert fh.testzip() is None, fh.testzip()
 
-            # Unrelated files, just for history
-            fh.writestr(constants.ZIP_WORDS_COUNT, str(self.words_count + self.variants_count))
-            fh.writestr(constants.ZIP_WORDS_SNAPSHOT, self.snapshot)
+            self.tmp_file(file).replace(file)
+            self.manifest_file(file).write_text(json.dumps(manifest, ensure_ascii=False, sort_keys=True))
+            log.info(
+                "[%s] Reused %s unchanged HTML files of %s from the previous build", self.id(), f"{count:,}", file.name
+            )
+            self.summary(file)
 
-            for file in to_compress:
-                fh.write(file, arcname=file.name)
+    @staticmethod
+    def manifest_file(file: Path) -> Path:
+        """The manifest of HTML files of a ZIP: the digest of their content, and their CRC, by prefix."""
+        return file.with_name(f"{file.name}.manifest.json")
 
-            # Check the ZIP validity
-            # testzip() returns the name of the first corrupt file, or None
-            assert fh.testzip() is None, fh.testzip()
+    @staticmethod
+    def tmp_file(file: Path) -> Path:
+        """The ZIP being crafted, the previous one being still readable until the end."""
+        return file.with_name(f"{file.name}.tmp")
+
+    def open_previous(self, stack: ExitStack, file: Path) -> tuple[ZipFile | None, Manifest]:
+        """Open the ZIP of the previous build, alongside its manifest, if any."""
+        manifest_file = self.manifest_file(file)
+        if not (file.is_file() and manifest_file.is_file()):
+            return None, {}
+        try:
+            manifest = {
+                prefix: (digest, crc) for prefix, (digest, crc) in json.loads(manifest_file.read_text()).items()
+            }
+            return stack.enter_context(ZipFile(file)), manifest
+        except (BadZipFile, ValueError):
+            log.warning("[%s] Ignoring the unreadable previous build %s", self.id(), file.name)
+            return None, {}
 
-        self.summary(final_file)
+    @staticmethod
+    def previous_info(fh: ZipFile | None, manifest: Manifest, prefix: str) -> ShardInfo | None:
+        """Return the manifest information of an HTML file of the previous build, if it is still in its ZIP, as is."""
+        if fh and (info := manifest.get(prefix)) and (zinfo := fh.NameToInfo.get(f"{prefix}.html")):
+            return info if zinfo.CRC == info[1] else None
+        return None
 
-    def save_html(self, name: str, words: Words, output_dir: Path) -> Path | None:
-        """Generate individual HTML files.
+    def craft_html(self, words: Words) -> list[str]:
+        """Generate the content of an individual HTML file, once per etymology mode.
 
         Content of the HTML file:
 
@@ -427,19 +649,55 @@ def save_html(self, name: str, words: Words, output_dir: Path) -> Path | None:
                 ...
             </html>
         """
+        rendered = [lines for word in words for lines in self.handle_word_modes(word, self.words)]
+        return ["".join(lines) for lines in zip(*rendered)]
 
-        # Save to uncompressed HTML
-        if not (data := "".join(line for word in words for line in self.handle_word(word, self.words))):
-            return None
-        raw_output = output_dir / f"{name}.raw.html"
-        raw_output.write_text(data, encoding="utf-8")
 
-        # Compress the HTML with gzip
-        output = output_dir / f"{name}.html"
-        with raw_output.open(mode="rb") as fi, gzip.open(output, mode="wb") as fo:
-            fo.write(fi.read())
+def compress_html(content: str, previous: ShardInfo | None = None) -> tuple[ShardInfo, bytes | None]:
+    """Compress the content of an individual HTML file with gzip, unless it is the same as the `previous` one.
+    Return the digest of the content, and the CRC of compressed data, alongside compressed data, if any.
+    """
+    raw = content.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    if previous and previous[0] == digest:
+        return previous, None
+    data = gzip.compress(raw, mtime=0)
+    return (digest, zlib.crc32(data)), data
+
+
+def copy_zip_member(src: ZipFile | None, dst: ZipFile, name: str) -> None:
+    """Copy a member from a ZIP to another, as is: neither decompressed, nor compressed again.
+    Note: `zipfile` has no public API for that, what `ZipFile.writestr()` does is reproduced with raw data.
+    When internals of `ZipFile` it relies on are missing, the member is decompressed, and compressed again.
+    """
+    assert src and src.fp and dst.fp
+    info = src.getinfo(name)
+    zinfo = ZipInfo(name, date_time=info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.external_attr = info.external_attr
+    if not all(hasattr(dst, attr) for attr in ZIP_INTERNALS):
+        dst.writestr(zinfo, src.read(name))
+        return
 
-        return output
+    src.fp.seek(info.header_offset)
+    header = src.fp.read(ZIP_FILE_HEADER_SIZE)
+    name_length, extra_length = struct.unpack("<HH", header[-4:])
+    src.fp.seek(info.header_offset + ZIP_FILE_HEADER_SIZE + name_length + extra_length)
+    raw = src.fp.read(info.compress_size)
+
+    zinfo.file_size = info.file_size
+    zinfo.compress_size = info.compress_size
+    zinfo.CRC = info.CRC
+    with dst._lock:  # type: ignore[attr-defined]
+        dst.fp.seek(dst.start_dir)
+        zinfo.header_offset = dst.fp.tell()
+        dst._writecheck(zinfo)  # type: ignore[attr-defined]
+        dst._didModify = True  # type: ignore[attr-defined]
+        dst.fp.write(zinfo.FileHeader())
+        dst.fp.write(raw)
+        dst.start_dir = dst.fp.tell()
+        dst.filelist.append(zinfo)
+        dst.NameToInfo[name] = zinfo
 
 
 class DictFileFormat(BaseFormat):
@@ -449,12 +707,13 @@ class DictFileFormat(BaseFormat):
     template = WORD_TPL_DICTFILE
 
     def process(self) -> None:
-        file = self.dictionary_file(self.output_file)
         words = self.words
-        data = "".join(formatted_word for word in words for formatted_word in self.handle_word(word, words))
-        file.write_text(data, encoding="utf-8")
-
-        self.summary(file)
+        rendered = [lines for word in words for lines in self.handle_word_modes(word, words)]
+        contents = list(zip(*rendered)) or [() for _ in self.etymology_modes]
+        for include_etymology, lines in zip(self.etymology_modes, contents):
+            file = self.dictionary_file(self.output_file, include_etymology=include_etymology)
+            file.write_text("".join(lines), encoding="utf-8")
+            self.summary(file)
 
 
 class DictFileFormatForMobi(DictFileFormat):
@@ -504,20 +763,6 @@ def _convert(self) -> None:
             "cleanup": False,  # Prevent deleting temporary image files (~/.cache/pyglossary/DICT/FILE.gif)
         }
 
-        if isinstance(self, StarDictFormat):
-            writer_cls = glos.plugins["Stardict"].writerClass
-
-            # We do not want to compress the `.syn` file as it does not work everywhere (see issue #2407)
-            writer_cls.dictzipSynFile = False
-
-            # Do not append extra data to the book name
-            def get_bookname(cls) -> str:  # type: ignore[no-untyped-def]
-                bookname = str(cls._glos.getInfo("name"))
-                log.info("bookname: %s", bookname)
-                return bookname
-
-            writer_cls.getBookname = get_bookname
-
         glos.setInfo("description", self.description)
         glos.setInfo("title", self.title())
         glos.setInfo("website", self.website)
@@ -558,12 +803,223 @@ def process(self) -> None:
         self.summary(final_file)
 
 
+class StarDictFormat(DictFileFormat):
+    """
+    Save the data into a StarDict ZIP file, without converting the DictFile with PyGlossary.
+
+    Entries are rendered like DictFile ones, and read back the way PyGlossary reads them, so that files are the same
+    as those PyGlossary crafts with `sametypesequence=h`, and dictzip (the modification time of `.dict.dz` aside).
+
+    Format of resulting dict-LOCALE-LOCALE.zip:
+
+        dict-data.dict.dz
+        dict-data.idx
+        dict-data.ifo
+        dict-data.syn
+        res/*.gif
+    """
+
+    output_file = "dict-{lang_src}-{lang_dst}{etym_suffix}.zip"
+
+    def process(self) -> None:
+        words = self.words
+        entries: list[list[tuple[list[bytes], bytes]]] = [[] for _ in self.etymology_modes]
+        images: list[dict[str, bytes]] = [{} for _ in self.etymology_modes]
+
+        for word in words:
+            for rendered in self.handle_word_modes(word, words):
+                # Words without etymologies are rendered, and so read, once for all modes
+                read = {content: read_dictfile_entry(content) for content in set(rendered)}
+                for mode_entries, mode_images, content in zip(entries, images, rendered):
+                    if entry := read[content]:
+                        mode_entries.append(entry[:2])
+                        mode_images.update(entry[2])
+
+        for include_etymology, mode_entries, mode_images in zip(self.etymology_modes, entries, images):
+            file = self.dictionary_file(self.output_file, include_etymology=include_etymology)
+            self.save(file, mode_entries, mode_images)
+            self.summary(file)
+
+    def save(self, file: Path, entries: list[tuple[list[bytes], bytes]], images: dict[str, bytes]) -> None:
+        """Craft StarDict files in memory, and write them into the ZIP file.
+        `entries` are the UTF-8 encoded words, the first one being the headword, and the definition.
+        """
+        # Same order as PyGlossary: by lowercased (ASCII-only), then original, word
+        entries.sort(key=lambda entry: (entry[0][0].lower(), entry[0][0]))
+
+        dict_data: list[bytes] = []
+        idx: list[bytes] = []
+        synonyms: list[tuple[bytes, int]] = []
+        offset = 0
+        for index, (b_words, b_defi) in enumerate(entries):
+            dict_data.append(b_defi)
+            idx.append(b_words[0] + b"\0" + struct.pack(">II", offset, len(b_defi)))
+            synonyms.extend((b_alt, index) for b_alt in b_words[1:])
+            offset += len(b_defi)
+        synonyms.sort(key=lambda synonym: (synonym[0].lower(), synonym[0]))
+        idx_data = b"".join(idx)
+
+        info = {
+            "version": "3.0.0",
+            "bookname": self.title(),
+            "wordcount": str(len(entries)),
+            "idxfilesize": str(len(idx_data)),
+            "sametypesequence": "h",
+        }
+        if synonyms:
+            info["synwordcount"] = str(len(synonyms))
+        info["website"] = self.website
+        info["date"] = f"{self.snapshot[:4]}-{self.snapshot[4:6]}-{self.snapshot[6:8]}"
+        info["description"] = self.description
+
+        ifo = "StarDict's dict ifo file\n" + "".join(f"{key}={value}\n" for key, value in info.items())
+        syn = b"".join(b_alt + b"\0" + struct.pack(">I", index) for b_alt, index in synonyms)
+
+        with ZipFile(file, mode="w", compression=ZIP_DEFLATED) as fh:
+            fh.writestr("dict-data.dict.dz", dictzip(b"".join(dict_data), "dict-data.dict"))
+            fh.writestr("dict-data.idx", idx_data)
+            fh.writestr("dict-data.ifo", ifo)
+            # The `.syn` file is not compressed as it does not work everywhere (see issue #2407)
+            if syn:
+                fh.writestr("dict-data.syn", syn)
+            for name, data in sorted(images.items()):
+                fh.writestr(f"res/{name}", data)
+
+
+def read_dictfile_entry(entry: str) -> tuple[list[bytes], bytes, dict[str, bytes]] | None:
+    """Read an entry rendered by `WORD_TPL_DICTFILE` like PyGlossary reads, and filters, DictFile entries.
+    Return its UTF-8 encoded words (the headword first), its definition, and its inline images,
+    or `None` when the entry would be skipped.
+
+    Note: a line starting with "@" in a definition does not start another entry, contrary to PyGlossary.
+    """
+    lines = entry.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    words = [lines[0][1:].strip()]
+    defi_lines: list[str] = []
+    for line in lines[1:]:
+        if line.startswith(": "):
+            defi_lines.append(line[2:])
+        elif line.startswith("::"):
+            continue
+        elif line.startswith("&"):
+            words.append(line[1:].strip())
+        else:
+            defi_lines.append(line.removeprefix("<html>"))
+
+    defi = (
+        "\n".join(defi_lines)
+        .replace("\n @", "\n@")
+        .replace("\n :", "\n:")
+        .replace("\n &", "\n&")
+        .replace("</p><br />", "</p>")
+        .replace("</p><br/>", "</p>")
+        .replace("</p></br>", "</p>")
+        .strip()
+    )
+
+    images: dict[str, bytes] = {}
+
+    def extract_image(match: re.Match[str]) -> str:
+        src = match[1].removeprefix("data:image/")
+        fmt, sep, src = src.partition(";")
+        if not sep or not src.startswith("base64,"):
+            log.error("Bad inline image: %s...", src[:60])
+            return ""
+        data = base64.b64decode(src.removeprefix("base64,"))
+        name = f"{zlib.crc32(data):08x}.{fmt}"
+        images[name] = data
+        return f'src="./{name}"'
+
+    defi = RE_INLINE_IMAGE(extract_image, defi).strip()
+    while defi.endswith(("<BR>", "<br>")):
+        defi = defi[:-4]
+    if len(words) > 1:
+        words = list(dict.fromkeys(word for word in words if word))
+    if not words or not words[0] or not defi:
+        return None
+    return [word.encode("utf-8") for word in words], defi.encode("utf-8"), images
+
+
+def dictzip(data: bytes, filename: str, *, mtime: int = 0) -> bytes:
+    """Compress `data` into the dictzip format, chunks being compressed by a pool of threads (zlib releases the GIL).
+    The output is the same as idzip's one, used by PyGlossary, given the same modification time.
+    """
+    view = memoryview(data)
+    chunks = [view[start : start + DICTZIP_CHUNK_LENGTH] for start in range(0, len(data), DICTZIP_CHUNK_LENGTH)]
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        compressed = list(pool.map(compress_dictzip_chunk, chunks))
+
+    output: list[bytes] = []
+    name = filename.encode()
+    # Only the first member carries the file name, and the modification time
+    for first in range(0, len(chunks) or 1, DICTZIP_MAX_CHUNKS):
+        member = view[first * DICTZIP_CHUNK_LENGTH : (first + DICTZIP_MAX_CHUNKS) * DICTZIP_CHUNK_LENGTH]
+        lengths = [len(chunk) for chunk in compressed[first : first + DICTZIP_MAX_CHUNKS]]
+        field_length = 6 + 2 * len(lengths)
+        output.extend(
+            (
+                b"\x1f\x8b\x08",
+                bytes([0x04 | (0x08 if name else 0)]),  # FEXTRA, and FNAME
+                struct.pack("<IBBH", mtime, 2, 3, 4 + field_length),  # Best compression, Unix
+                b"RA"
+                + struct.pack(f"<4H{len(lengths)}H", field_length, 1, DICTZIP_CHUNK_LENGTH, len(lengths), *lengths),
+                name + b"\0" if name else b"",
+                *compressed[first : first + DICTZIP_MAX_CHUNKS],
+                b"\x03\x00",  # Empty final block
+                struct.pack("<II", zlib.crc32(member), len(member)),
+            )
+        )
+        name = b""
+        mtime = 0
+    return b"".join(output)
+
+
+def compress_dictzip_chunk(chunk: memoryview) -> bytes:
+    """Compress a dictzip chunk, independently of others."""
+    compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(chunk) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+
 class BZ2DictFileFormat(BaseFormat):
+    """
+    Save the DictFile into a *.df.bz2* file.
+
+    The DictFile is read block after block, and blocks are compressed by a pool of threads (bz2 releases the GIL)
+    into as many bz2 streams, concatenated like pbzip2 does, while next ones are read.
+    Standard bz2 readers decompress all streams. The checksum is computed as compressed streams are written.
+    """
+
+    block_size = 900_000  # The block size of bz2 at its best compression level
+
     def process(self) -> None:
         df_file = self.dictionary_file(DictFileFormat.output_file)
         bz2_file = df_file.with_suffix(".df.bz2")
-        bz2_file.write_bytes(bz2.compress(df_file.read_bytes()))
-        return self.summary(bz2_file)
+        digest = hashlib.new(constants.ASSET_CHECKSUM_ALGO)
+        workers = os.cpu_count() or 1
+        pending: deque[Future[bytes]] = deque()
+
+        with (
+            df_file.open("rb") as src,
+            bz2_file.open("wb") as dst,
+            ThreadPoolExecutor(max_workers=workers) as pool,
+        ):
+
+            def write(max_pending: int) -> None:
+                while len(pending) > max_pending:
+                    data = pending.popleft().result()
+                    digest.update(data)
+                    dst.write(data)
+
+            # An empty DictFile still gives a valid, empty, stream
+            block = src.read(self.block_size)
+            while True:
+                pending.append(pool.submit(bz2.compress, block))
+                write(2 * workers)
+                if not (block := src.read(self.block_size)):
+                    break
+            write(0)
+
+        self.summary(bz2_file, checksum=digest.hexdigest())
 
 
 class DictOrgFormat(ConverterFromDictFile):
@@ -613,22 +1069,13 @@ def _compress(self) -> Path:
         return super()._compress()
 
 
-class StarDictFormat(ConverterFromDictFile):
-    """Save the data into a StarDict file."""
-
-    target_format = "stardict"
-    target_suffix = "ifo"
-    final_file = "dict-{lang_src}-{lang_dst}{etym_suffix}.zip"
-    glossary_options = {"dictzip": True, "sametypesequence": "h"}
-
-
 def get_primary_formatters() -> list[type[BaseFormat]]:
-    return [KoboFormat, DictFileFormat]
+    return [KoboFormat, DictFileFormat, StarDictFormat]
 
 
 def get_secondary_formatters() -> list[type[BaseFormat]]:
     """Formatters that require files generated by `get_primary_formatters()`."""
-    return [BZ2DictFileFormat, DictOrgFormat, StarDictFormat]
+    return [BZ2DictFileFormat, DictOrgFormat]
 
 
 def run_mobi_formatter(
@@ -638,84 +1085,82 @@ def run_mobi_formatter(
     words: Words,
     variants: Variants,
     *,
-    include_etymology: bool = True,
+    include_etymology: bool | None = True,
+    resolved_variants: ResolvedVariants | None = None,
 ) -> None:
     """Mobi formatter.
-
-    For multiple languages, we need to delete words if the total number of unique unicode characters is greater than 256.
-    To do this, we delete words using the least-used characters until we meet this condition.
+    With `include_etymology` set to `None`, both dictionaries, with and without etymologies, are crafted.
+    `resolved_variants` of all words are reused, unless words have to be removed (cf `prepare_mobi_words()`).
     """
 
     if locale in constants.MOBI_SKIP:
         log.info("[Mobi %s] Skipping as the final file size would be > 650 MiB", locale.upper())
         return
 
-    def all_chars(word: str, details: Word) -> set[str]:
-        chars = set(word)
-        if definitions := details.definitions:
-            if isinstance(definitions, str):
-                chars.update(definitions)
-            elif isinstance(definitions, tuple):
-                chars.update(user_functions.flatten(definitions))
-        if etymology := details.etymology:
-            if isinstance(etymology, str):
-                chars.update(etymology)
-            elif isinstance(etymology, tuple):
-                chars.update(user_functions.flatten(etymology))
-        return chars
-
-    stats = defaultdict(list)
-    for word, details in words.copy().items():
-        if len(word) > 127:
-            log.info("[Mobi %s] Truncated word too long: %r", locale.upper(), word)
-            truncated = word[:127]
-            words[truncated] = words.pop(word)
-            word = truncated
-        for char in all_chars(word, details):
-            stats[char].append(word)
-
-    if locale in constants.MOBI_CLEANUP and len(stats) > 256:
-        new_words = words.copy()
-        threshold = 1
-        while len(stats) > 256:
-            log.info(
-                "[Mobi %s] Removing words with unique characters count at %d (total is %d)",
-                locale.upper(),
-                threshold,
-                len(stats),
-            )
-            for char, related_words in sorted(stats.copy().items(), key=lambda v: (char, len(v[1]))):
-                if len(related_words) == threshold:
-                    for w in related_words:
-                        new_words.pop(w, None)
-                    stats.pop(char)
-                if len(stats) <= 256:
-                    break
-            threshold += 1
+    mobi_words = prepare_mobi_words(locale, words)
+    if len(mobi_words) < len(words):
+        variants = make_variants(mobi_words)
+        resolved_variants = None
+    words = mobi_words
 
-        log.info(
-            "[Mobi %s] Removed %s words from .mobi (total words count is %s, unique characters count is %d)",
-            locale.upper(),
-            f"{len(words) - len(new_words):,}",
-            f"{len(new_words):,}",
-            len(stats),
-        )
-        words = new_words
-        variants = make_variants(words)
-    else:
+    args = (locale, output_dir, words, variants, file.stem.split("-")[-1])
+    run_formatter(
+        DictFileFormatForMobi, *args, include_etymology=include_etymology, resolved_variants=resolved_variants
+    )
+    for etymology_mode in ETYMOLOGY_MODES if include_etymology is None else (include_etymology,):
+        try:
+            run_formatter(MobiFormat, *args, include_etymology=etymology_mode)
+        except Exception:
+            log.exception("[Mobi %s] Error with the Mobi conversion", locale.upper())
+
+
+def prepare_mobi_words(locale: str, words: Words, *, max_chars: int = MOBI_MAX_CHARS) -> Words:
+    """Return words to put into the Mobi dictionary, `words` being left untouched.
+
+    Words too long are truncated.
+    For multiple languages, we need to delete words if the total number of unique unicode characters is greater than
+    `max_chars`. To do this, we delete words using the least-used characters until we meet this condition.
+    """
+    if any(len(word) > MOBI_MAX_WORD_LENGTH for word in words):
+        truncated_words: Words = {}
+        for word, details in words.items():
+            if len(word) > MOBI_MAX_WORD_LENGTH:
+                log.info("[Mobi %s] Truncated word too long: %r", locale.upper(), word)
+                word = word[:MOBI_MAX_WORD_LENGTH]
+            truncated_words[word] = details
+        words = truncated_words
+
+    # Count words using each character, characters being kept in order of appearance
+    chars_count = Counter(chain.from_iterable(map(set, words)))
+
+    if locale not in constants.MOBI_CLEANUP or len(chars_count) <= max_chars:
         log.info(
             "[Mobi %s] Untouched words for .mobi (total words count is %s, unique characters count is %d)",
             locale.upper(),
             f"{len(words):,}",
-            len(stats),
+            len(chars_count),
         )
-
-    args = (locale, output_dir, words, variants, file.stem.split("-")[-1])
-    run_formatter(DictFileFormatForMobi, *args, include_etymology=include_etymology)
-    try:
-        run_formatter(MobiFormat, *args, include_etymology=include_etymology)
-    except Exception:
-        log.exception("[Mobi %s] Error with the Mobi conversion", locale.upper())
+        return words
+
+    # Least-used characters go first, ties being broken by order of appearance, as the sort is stable
+    removed_chars = sorted(chars_count, key=chars_count.__getitem__)[: len(chars_count) - max_chars]
+    log.info(
+        "[Mobi %s] Removing words with unique characters count up to %d (total is %d)",
+        locale.upper(),
+        chars_count[removed_chars[-1]],
+        len(chars_count),
+    )
+    removed = set(removed_chars)
+    new_words = {word: details for word, details in words.items() if removed.isdisjoint(word)}
+
+    log.info(
+        "[Mobi %s] Removed %s words from .mobi (total words count is %s, unique characters count is %d)",
+        locale.upper(),
+        f"{len(words) - len(new_words):,}",
+        f"{len(new_words):,}",
+        max_chars,
+    )
+    return new_words
 
 
 def run_formatter(
@@ -726,7 +1171,8 @@ def run_formatter(
     variants: Variants,
     snapshot: str,
     *,
-    include_etymology: bool = True,
+    include_etymology: bool | None = True,
+    resolved_variants: ResolvedVariants | None = None,
 ) -> None:
     formatter = cls(
         locale,
@@ -735,15 +1181,15 @@ def run_formatter(
         variants,
         snapshot,
         include_etymology=include_etymology,
+        resolved_variants=resolved_variants,
     )
     formatter.process()
 
 
 def load(file: Path) -> Words:
-    """Load the big JSON file containing all words and their details."""
+    """Load the JSON Lines file containing all words and their details."""
     log.info("Loading %s ...", file)
-    with file.open(encoding="utf-8") as fh:
-        words: Words = {key: Word(**values) for key, values in json.load(fh).items()}
+    words: Words = {key: Word(**values) for key, values in utils.read_json_lines(file)}
     log.info("Loaded %s words from %s", f"{len(words):,}", file)
     return words
 
@@ -759,6 +1205,49 @@ def make_variants(words: Words) -> Variants:
     return variants
 
 
+def finalize_variants(word: str, variants: Iterable[str], *, kobo: bool = False) -> tuple[str, ...]:
+    """Deduplicate, and sort, `variants` of a `word`, the word itself excluded.
+    For Kobo, variants with a different prefix than their word are filtered out, and kept ones are normalized
+    by trimming whitespaces, and lowercasing them.
+    """
+    variants = (variant for variant in variants if variant != word)
+    if kobo:
+        guess_prefix = utils.guess_prefix
+        prefix = guess_prefix(word)
+        variants = (sys.intern(variant.lower().strip()) for variant in variants if guess_prefix(variant) == prefix)
+    return tuple(sorted(set(variants), key=lambda s: (len(s), s)))
+
+
+def resolve_variants(words: Words, variants: Variants) -> ResolvedVariants:
+    """Resolve variants of words with definitions, adding variants of their variants without definitions.
+
+    Only 1 redirection is followed:
+        [ES] gastada* -> gastado* -> gastar --> (gastada, gastado) -> gastar
+    Note: the process works backward: from gastar up to gastado up to gastada.
+    """
+    log.info("Resolving variants ...")
+    intern = sys.intern
+    resolved = ResolvedVariants({}, {}, {})
+    for word, word_variants in variants.items():
+        if not ((details := words.get(word)) and details.definitions):
+            continue
+
+        expanded = [*word_variants]
+        for variant in word_variants:
+            if (wv := words.get(variant)) and not wv.definitions and (new_variants := variants.get(variant)):
+                expanded.extend(new_variants)
+
+        word = intern(word)
+        resolved.expanded[word] = tuple(intern(variant) for variant in expanded)
+        resolved.all[word] = finalize_variants(word, resolved.expanded[word])
+        resolved.kobo[word] = finalize_variants(word, resolved.expanded[word], kobo=True)
+        if len(resolved.all[word]) > MAX_VARIANTS:
+            log.warning("Word %r has too many variants (%d): %r", word, len(resolved.all[word]), resolved.all[word])
+
+    log.info("Resolved variants of %s words", f"{len(resolved.all):,}")
+    return resolved
+
+
 def distribute_workload(
     formatters: list[type[BaseFormat]],
     output_dir: Path,
@@ -767,32 +1256,56 @@ def distribute_workload(
     words: Words,
     variants: Variants,
     *,
-    include_etymology: bool = True,
+    include_etymology: bool | None = True,
+    processes: bool = False,
+    resolved_variants: ResolvedVariants | None = None,
 ) -> None:
-    """Run formatters in parallel."""
-    threads = []
+    """Run formatters in parallel.
+    With `include_etymology` set to `None`, primary formatters craft dictionaries with, and without, etymologies at once.
+    `resolved_variants` are shared by all formatters, rather than resolved by each of them.
+    With `processes`, each formatter runs into its own forked process, sharing words and variants copy-on-write,
+    rather than into a thread competing for the GIL.
+    """
+    workers: list[threading.Thread | BaseProcess] = []
+    snapshot = file.stem.split("-")[-1]
+    use_fork = processes and "fork" in multiprocessing.get_all_start_methods()
+
+    worker_cls: Callable[..., threading.Thread | BaseProcess] = (
+        multiprocessing.get_context("fork").Process if use_fork else threading.Thread
+    )
+    if use_fork:
+        # Keep the garbage collector of children from touching, and so copying, objects inherited from the parent
+        gc.freeze()
 
     for formatter in formatters:
-        th = threading.Thread(
+        worker = worker_cls(
             target=run_formatter,
-            args=(formatter, locale, output_dir, words, variants, file.stem.split("-")[-1]),
-            kwargs={"include_etymology": include_etymology},
+            args=(formatter, locale, output_dir, words, variants, snapshot),
+            kwargs={"include_etymology": include_etymology, "resolved_variants": resolved_variants},
+            name=formatter.__name__,
         )
-        th.start()
-        threads.append(th)
+        worker.start()
+        workers.append(worker)
 
-    for th in threads:
-        th.join()
+    for worker in workers:
+        worker.join()
+        if isinstance(worker, BaseProcess) and worker.exitcode:
+            log.error("[%s] Conversion failed with exit code %d", worker.name, worker.exitcode)
+
+    if use_fork:
+        gc.unfreeze()
 
 
 def get_latest_json_file(source_dir: Path) -> Path | None:
-    """Get the name of the last data-*.json file."""
-    files = list(source_dir.glob(f"data-{'[0-9]' * 8}.json"))
+    """Get the name of the last data-*.jsonl file (or data-*.json, of the former format)."""
+    files = [file for suffix in ("json", "jsonl") for file in source_dir.glob(f"data-{'[0-9]' * 8}.{suffix}")]
     return sorted(files)[-1] if files else None
 
 
-def main(locale: str) -> int:
-    """Entry point."""
+def main(locale: str, *, processes: bool = False) -> int:
+    """Entry point.
+    With `processes`, formatters run into separate processes rather than threads.
+    """
 
     lang_src, lang_dst = utils.guess_locales(locale)
 
@@ -804,6 +1317,7 @@ def main(locale: str) -> int:
     # Get all words from the database
     words: Words = load(input_file)
     variants: Variants = make_variants(words)
+    resolved_variants = resolve_variants(words, variants)
 
     # And run formatters, distributing the workload
     output_dir = source_dir / "output"
@@ -811,10 +1325,18 @@ def main(locale: str) -> int:
     args = (output_dir, input_file, locale, words, variants)
 
     start = monotonic()
-    for include_etymology in [False, True]:
-        distribute_workload(get_primary_formatters(), *args, include_etymology=include_etymology)
-        distribute_workload(get_secondary_formatters(), *args, include_etymology=include_etymology)
-        run_mobi_formatter(*args, include_etymology=include_etymology)
+    # Primary formatters craft dictionaries of all etymology modes from a single traversal of words,
+    # secondary ones convert crafted dictionaries one after the other as they share temporary folders.
+    distribute_workload(
+        get_primary_formatters(),
+        *args,
+        include_etymology=None,
+        processes=processes,
+        resolved_variants=resolved_variants,
+    )
+    for include_etymology in ETYMOLOGY_MODES:
+        distribute_workload(get_secondary_formatters(), *args, include_etymology=include_etymology, processes=processes)
+    run_mobi_formatter(*args, include_etymology=None, resolved_variants=resolved_variants)
 
     log.info("Convert done in %s!", timedelta(seconds=monotonic() - start))
     return 0
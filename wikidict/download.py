@@ -58,11 +58,18 @@ def fetch_snapshots(locale: str) -> list[str]:
         return sorted(re.findall(r'href="(\d+)/"', req.text))
 
 
-def fetch_pages(date: str, locale: str, output: Path, *, callback: Callable[[str, int, bool], None]) -> None:
+def fetch_pages(
+    date: str,
+    locale: str,
+    output: Path,
+    *,
+    callback: Callable[[str, int, bool], None],
+    url: str = constants.DUMP_URL,
+) -> None:
     """Download all pages, current versions only.
     Return the path of the XML file BZ2 compressed.
     """
-    url = constants.DUMP_URL.format(locale=locale, snapshot=date)
+    url = url.format(locale=locale, snapshot=date)
     msg = f"Fetching {url} into {output}"
     log.info(msg)
 
@@ -88,12 +95,36 @@ def get_output_file_compressed(locale: str, snapshot: str) -> Path:
     return Path(os.getenv("CWD", "")) / "data" / locale / f"pages-{snapshot}.xml.bz2"
 
 
+def get_output_files_multistream(locale: str, snapshot: str) -> tuple[Path, Path]:
+    output_dir = Path(os.getenv("CWD", "")) / "data" / locale
+    return (
+        output_dir / f"pages-multistream-{snapshot}.xml.bz2",
+        output_dir / f"pages-multistream-index-{snapshot}.txt.bz2",
+    )
+
+
+def fetch_multistream(snapshot: str, locale: str) -> None:
+    """Download the multistream dump, and its index. They are kept compressed."""
+    file, index = get_output_files_multistream(locale, snapshot)
+    try:
+        fetch_pages(snapshot, locale, index, callback=callback_progress, url=constants.DUMP_URL_MULTISTREAM_INDEX)
+        fetch_pages(snapshot, locale, file, callback=callback_progress, url=constants.DUMP_URL_MULTISTREAM)
+    except HTTPError:
+        file.unlink(missing_ok=True)
+        index.unlink(missing_ok=True)
+        raise
+
+
 def get_output_file_uncompressed(file: Path) -> Path:
     return file.with_suffix(file.suffix.replace(".bz2", ""))
 
 
-def main(locale: str) -> int:
-    """Entry point."""
+def main(locale: str, *, stream: bool = False, multistream: bool = False) -> int:
+    """Entry point.
+    When *stream* is True, the dump is not uncompressed: `parse` will stream it directly.
+    When *multistream* is True, the multistream dump and its index are fetched instead: `parse` will spread it
+    across several processes.
+    """
 
     start = monotonic()
     locale = utils.guess_lang_origin(locale)
@@ -106,8 +137,12 @@ def main(locale: str) -> int:
         file_compressed = get_output_file_compressed(locale, snapshot)
         file_uncompressed = get_output_file_uncompressed(file_compressed)
         try:
+            if multistream:
+                fetch_multistream(snapshot, locale)
+                break
             fetch_pages(snapshot, locale, file_compressed, callback=callback_progress)
-            decompress(file_compressed, file_uncompressed, callback_progress)
+            if not stream:
+                decompress(file_compressed, file_uncompressed, callback_progress)
             break
         except HTTPError as exc:
             file_compressed.unlink(missing_ok=True)
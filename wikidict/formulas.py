@@ -0,0 +1,103 @@
+"""Formulas prefetching: <chem>, and <math>, formulas missing from the SVG cache are rendered before words are."""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING
+
+from . import constants, svg, utils
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+log = logging.getLogger(__name__)
+
+# Same tags as handled by `utils.process_templates()`, once the Wikicode is cleaned up by `utils.clean()`
+RE_FORMULA = re.compile(r"<(chem|math)>(.+?)</\1>")
+
+# Formula category to use with the Mathoid REST API, by HTML tag
+CATEGORIES = {"chem": "chem", "math": "tex"}
+
+# Number of formulas rendered concurrently
+WORKERS = 8
+
+
+def find_formulas(code: str) -> dict[str, str]:
+    """Find formulas of a given Wikicode, and return them alongside their category.
+    Formulas are looked for into the cleaned-up Wikicode, so that they are the same as the ones rendered later.
+
+    >>> find_formulas("Voir <math>V^n</math>, <math display=block> x_0 </math>, et <chem>H2O</chem>.")
+    {'V^n': 'tex', 'x_0': 'tex', 'H2O': 'chem'}
+    >>> find_formulas("<math>a^2 +\\n b^2</math>, et <chem>''A''</chem>.")
+    {'a^2 + b^2': 'tex', '<i>A</i>': 'chem'}
+    >>> find_formulas("Sans formule.")
+    {}
+    """
+    if "<math" not in code and "<chem>" not in code:
+        return {}
+    formulas: dict[str, str] = {}
+    for tag, formula in RE_FORMULA.findall(utils.clean(code)):
+        if f"<{tag}>" not in formula:
+            formulas[formula.strip()] = CATEGORIES[tag]
+    return formulas
+
+
+def find_missing_formulas(pages: Iterable[tuple[str, str]]) -> dict[str, str]:
+    """Find formulas of all `pages` that are not in the SVG cache yet.
+    When the FORCE_FORMULA_RENDERING envar is set, all formulas are considered missing.
+    """
+    force = "FORCE_FORMULA_RENDERING" in os.environ
+    missing: dict[str, str] = {}
+    for _, code in pages:
+        for formula, cat in find_formulas(code).items():
+            if force or not svg.get(formula):
+                missing[formula] = cat
+    return missing
+
+
+def render_formulas(formulas: dict[str, str], *, base_url: str, workers: int = WORKERS) -> dict[str, str]:
+    """Render `formulas`, alongside their category, using `workers` concurrent requests.
+    Formulas that cannot be rendered are skipped.
+    """
+    svgs: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(utils.render_formula, formula, cat=cat, base_url=base_url): formula
+            for formula, cat in formulas.items()
+        }
+        for future in as_completed(futures):
+            formula = futures[future]
+            try:
+                svgs[formula] = future.result()
+            except Exception:
+                log.exception("ERROR rendering the %r formula", formula)
+    return svgs
+
+
+def prefetch(
+    pages: Iterable[tuple[str, str]],
+    *,
+    base_url: str = "",
+    workers: int = WORKERS,
+    save: bool = True,
+) -> int:
+    """Render formulas of `pages` missing from the SVG cache, and return the number of newly rendered formulas.
+    The Mathoid REST API is the one of Wikimedia, unless `base_url`, or the MATHOID_URL envar, is set.
+    When `save` is True, formulas are stored into the cache database of the data folder, else they are only kept
+    in memory. Either way, the compressed cache of the package is only updated using add-to-cache.py.
+    """
+    if not (missing := find_missing_formulas(pages)):
+        return 0
+
+    base_url = base_url or os.getenv("MATHOID_URL", constants.WIKIMEDIA_URL_BASE)
+    log.info("Rendering %s formulas using %s ...", f"{len(missing):,}", base_url)
+    svgs = render_formulas(missing, base_url=base_url, workers=workers)
+    if save and svgs:
+        svg.save(svgs)
+    elif not save:
+        for formula, svg_raw in svgs.items():
+            svg.set(formula, svg_raw)
+    return len(svgs)
@@ -4,6 +4,7 @@
 from datetime import UTC, datetime
 from pathlib import Path
 
+from . import constants, session
 from .convert import (
     DictFileFormat,
     DictOrgFormat,
@@ -23,7 +24,10 @@ def main(locale: str, words: str, output: str, *, format: str = "kobo") -> int:
     output_dir = Path(os.getenv("CWD", "")) / output
     output_dir.mkdir(parents=True, exist_ok=True)
     words_stripped = [word_stripped for word in words.split(",") if (word_stripped := word.strip())]
-    all_words = {word: get_word(word, locale) for word in words_stripped}
+
+    # Unchanged pages are not fetched again from a run to another
+    with constants.SESSION.cached(session.get_cache_file()):
+        all_words = {word: get_word(word, locale) for word in words_stripped}
     variants: Variants = make_variants(all_words)
     args: tuple[str, Path, Words, Variants, str] = (
         locale,
@@ -44,7 +48,6 @@ def main(locale: str, words: str, output: str, *, format: str = "kobo") -> int:
         case "kindle" | "mobi":
             run_mobi_formatter(output_dir, Path(f"data-{args[-1]}.json"), locale, all_words, variants)
         case "stardict":
-            run_formatter(DictFileFormat, *args)
             run_formatter(StarDictFormat, *args)
         case _:
             print(f"Unknown {format = }")
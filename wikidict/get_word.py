@@ -6,7 +6,7 @@
 import re
 from typing import TYPE_CHECKING
 
-from . import constants, utils
+from . import constants, formulas, utils
 from .render import parse_word
 from .user_functions import int_to_roman
 
@@ -28,6 +28,7 @@ def get_word(word: str, locale: str, *, all_templates: list[tuple[str, str, str]
     with constants.SESSION.get(url) as req:
         req.raise_for_status()
         code = req.text
+    formulas.prefetch([(word, code)], save=False)
     return parse_word(word, code, locale, force=True, all_templates=all_templates)
 
 
@@ -1,64 +1,94 @@
 """Internationalization stuff."""
 
+from collections.abc import Iterator, Mapping
 from importlib import import_module
 from pathlib import Path
 from typing import Any
 
 from . import defaults
 
-_ALL_LOCALES = {
-    locale.name: import_module(f"wikidict.lang.{locale.name}")
+_ALL_LOCALES = tuple(
+    locale.name
     for locale in sorted(Path(__file__).parent.glob("*"))
     if locale.is_dir() and bool(list(locale.glob("*.py", case_sensitive=True)))
-}
+)
 
 
-def _populate(attr: str) -> dict[str, Any]:
+class _Populated(Mapping[str, Any]):
     """
-    Create a dict for all locales pointing to the appropriate attribute.
+    Mapping of all locales pointing to the appropriate attribute.
+    A locale is only imported the first time one of its attributes is accessed.
+    """
+
+    def __init__(self, attr: str) -> None:
+        self.attr = attr
+        self._values: dict[str, Any] = {}
+
+    def __getitem__(self, locale: str) -> Any:
+        try:
+            return self._values[locale]
+        except KeyError:
+            if locale not in _ALL_LOCALES:
+                raise
+        module = import_module(f"wikidict.lang.{locale}")
+        value = getattr(module, self.attr) if hasattr(module, self.attr) else getattr(defaults, self.attr)
+        self._values[locale] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_ALL_LOCALES)
+
+    def __len__(self) -> int:
+        return len(_ALL_LOCALES)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.attr!r}>"
+
+
+def _populate(attr: str) -> Mapping[str, Any]:
+    """
+    Create a mapping for all locales pointing to the appropriate attribute.
     Fallback to `defaults`.
     """
-    return {
-        locale.__name__.split(".")[-1]: getattr(locale, attr) if hasattr(locale, attr) else getattr(defaults, attr)
-        for locale in _ALL_LOCALES.values()
-    }
+    return _Populated(attr)
 
 
 # Float number separator
-float_separator: dict[str, str] = _populate("float_separator")
+float_separator: Mapping[str, str] = _populate("float_separator")
 
 # Thousands separator
-thousands_separator: dict[str, str] = _populate("thousands_separator")
+thousands_separator: Mapping[str, str] = _populate("thousands_separator")
 
 # Markers for sections that contain interesting text to analyse.
-section_patterns: dict[str, tuple[str, ...]] = _populate("section_patterns")
-sublist_patterns: dict[str, tuple[str, ...]] = _populate("sublist_patterns")
-section_level: dict[str, int] = _populate("section_level")
-section_sublevels: dict[str, tuple[int, ...]] = _populate("section_sublevels")
-head_sections: dict[str, tuple[str, ...]] = _populate("head_sections")
-etyl_section: dict[str, tuple[str]] = _populate("etyl_section")
-sections: dict[str, tuple[str, ...]] = _populate("sections")
+section_patterns: Mapping[str, tuple[str, ...]] = _populate("section_patterns")
+sublist_patterns: Mapping[str, tuple[str, ...]] = _populate("sublist_patterns")
+section_level: Mapping[str, int] = _populate("section_level")
+section_sublevels: Mapping[str, tuple[int, ...]] = _populate("section_sublevels")
+head_sections: Mapping[str, tuple[str, ...]] = _populate("head_sections")
+head_sections_markers: Mapping[str, tuple[str, ...]] = _populate("head_sections_markers")
+etyl_section: Mapping[str, tuple[str]] = _populate("etyl_section")
+sections: Mapping[str, tuple[str, ...]] = _populate("sections")
 
 # Variants
 # Section titles considered interesting to look variants into
-variant_titles: dict[str, tuple[str, ...]] = _populate("variant_titles")
+variant_titles: Mapping[str, tuple[str, ...]] = _populate("variant_titles")
 # Template names considered interesting to look variants into
-variant_templates: dict[str, tuple[str, ...]] = _populate("variant_templates")
+variant_templates: Mapping[str, tuple[str, ...]] = _populate("variant_templates")
 
 # Some definitions are not good to keep
-definitions_to_ignore: dict[str, tuple[str, ...]] = _populate("definitions_to_ignore")
+definitions_to_ignore: Mapping[str, tuple[str, ...]] = _populate("definitions_to_ignore")
 
 # Templates replacements: wikicode -> text conversion
 
 # Templates to ignore: the text will be deleted.
-templates_ignored: dict[str, tuple[str, ...]] = _populate("templates_ignored")
+templates_ignored: Mapping[str, tuple[str, ...]] = _populate("templates_ignored")
 
 # Templates that will be completed/replaced using italic style.
 # Ex: {{absol}} -> <i>(Absolument)</i>
 # Ex: {{absol|fr}} -> <i>(Absolument)</i>
 # Ex: {{absol|fr|123}} -> <i>(Absolument)</i>
 # Ex: {{absol|fr|123|...}} -> <i>(Absolument)</i>
-templates_italic: dict[str, dict[str, str]] = _populate("templates_italic")
+templates_italic: Mapping[str, dict[str, str]] = _populate("templates_italic")
 
 # Templates more complex to manage. More work is needed.
 # The code on the right will be passed to a function that will execute it.
@@ -73,10 +103,10 @@ def _populate(attr: str) -> dict[str, Any]:
 #   - *parts* will contain the list ["comparatif de", "bien", "fr", "adv"].
 #
 # You can access to *tpl* and *parts* to apply changes and get the result wanted.
-templates_multi: dict[str, dict[str, str]] = _populate("templates_multi")
+templates_multi: Mapping[str, dict[str, str]] = _populate("templates_multi")
 
 # Templates that will be completed/replaced using custom style.
-templates_other: dict[str, dict[str, str]] = _populate("templates_other")
+templates_other: Mapping[str, dict[str, str]] = _populate("templates_other")
 
 # Function to find gender(s)
 find_genders = _populate("find_genders")
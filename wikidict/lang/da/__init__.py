@@ -23,6 +23,12 @@
     "{{-mul-}}",
     "tværsprogligt",
 )
+head_sections_markers = (
+    # {{=da=}}, {{-da-}}
+    r"\{\{(?:=(?:da|mul)=|-(?:da|mul)-)\}\}",
+    # ===dansk===
+    r"=+\s*(?:dansk|tværsprogligt)\s*=+",
+)
 etyl_section = ("{{etym}}", "{{etym2}}", "etymologi", "etymologi 1", "etymologi 2", "etymologi 3", "etymologi 4")
 sections = (
     *etyl_section,
@@ -13,6 +13,8 @@
 # Markers for sections that contain interesting text to analyse.
 section_sublevels = (3, 4)
 head_sections = ("{{sprache|deutsch}}", "{{sprache|international}}")
+# == CIA ({{Sprache|Deutsch}}) ==
+head_sections_markers = (r"^==.*\(\{\{Sprache\|(?:Deutsch|International)\}\}\)",)
 etyl_section = ("{{herkunft}}",)
 sections = (
     *etyl_section,
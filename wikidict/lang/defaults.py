@@ -19,6 +19,8 @@
 section_level = 2
 section_sublevels = (3,)
 head_sections = ("",)
+# Raw Wikicode turned into head sections by `adjust_wikicode()` (regular expressions)
+head_sections_markers: tuple[str, ...] = ()
 etyl_section = ("",)
 
 # Variants
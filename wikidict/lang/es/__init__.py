@@ -13,6 +13,8 @@
 
 # Markers for sections that contain interesting text to analyse.
 head_sections = ("{{lengua|es}}",)
+# {{ES|xxx|núm=n}}
+head_sections_markers = (r"^\{\{ES\|",)
 section_sublevels = (4, 3)
 etyl_section = ("etimología", "etimología 1")
 sections = (
@@ -15,6 +15,8 @@
 section_patterns = ("#", r"\*")
 section_sublevels = (3,)
 head_sections = ("{{limba|ron}}", "{{limba|ro}}", "{{limba|conv}}")
+# ==Romanian==
+head_sections_markers = (r"==Romanian==",)
 etyl_section = ("{{etimologie}}",)
 sections = (
     *etyl_section,
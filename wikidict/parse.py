@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
-import json
+import bz2
 import logging
+import multiprocessing
 import os
 import re
+import threading
 from collections import defaultdict
 from datetime import timedelta
+from functools import cache, partial
 from pathlib import Path
+from queue import Full, Queue
 from time import monotonic
 from typing import TYPE_CHECKING
 from xml.sax.saxutils import unescape
@@ -16,7 +20,7 @@
 from . import lang, utils
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Generator, Iterator
+    from collections.abc import Callable, Generator, Iterable, Iterator
 
 
 log = logging.getLogger(__name__)
@@ -28,23 +32,79 @@
 #    DEBUG_PARSE=1 python -m wikidict LOCALE --parse >out.log
 DEBUG_PARSE = "DEBUG_PARSE" in os.environ
 
+# Number of BZ2 streams handled by a worker at once when parsing a multistream dump.
+# There are 100 pages per stream.
+STREAMS_PER_TASK = 64
+
+
+def bz2_iter_lines(file: Path, *, chunk_size: int = 1024**2) -> Generator[str]:
+    """Decompress a BZ2 file on-the-fly, and yield its lines.
+    The decompression is done in a background thread (the BZ2 decompressor releases the GIL),
+    so that it overlaps with the parsing, and the uncompressed data never touches the disk.
+    """
+    chunks: Queue[list[str] | BaseException | None] = Queue(maxsize=16)
+    stop = threading.Event()
+
+    def put(item: list[str] | BaseException | None) -> None:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+            except Full:
+                continue
+            return
+
+    def decompress() -> None:
+        try:
+            with bz2.open(file, mode="rt", encoding="utf-8") as fh:
+                while not stop.is_set() and (lines := fh.readlines(chunk_size)):
+                    put(lines)
+        except BaseException as exc:
+            put(exc)
+        else:
+            put(None)
+
+    thread = threading.Thread(target=decompress, name=f"bz2-{file.name}", daemon=True)
+    thread.start()
+    try:
+        while (lines := chunks.get()) is not None:
+            if isinstance(lines, BaseException):
+                raise lines
+            yield from lines
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_lines(file: Path) -> Generator[str]:
+    """Yield lines of a XML dump, uncompressed or BZ2 compressed."""
+    if file.suffix == ".bz2":
+        yield from bz2_iter_lines(file)
+        return
+
+    with file.open(encoding="utf-8") as fh:
+        yield from fh
+
 
 def xml_iter_parse(file: Path) -> Generator[str]:
     """Efficient XML parsing for big files."""
+    yield from xml_iter_parse_lines(iter_lines(file))
+
+
+def xml_iter_parse_lines(lines: Iterable[str]) -> Generator[str]:
+    """Yield XML `<page>` elements found in `lines`."""
     element: list[str] = []
     is_element = False
 
-    with file.open(encoding="utf-8") as fh:
-        for line in fh:
-            if is_element:
-                if "/page>" in line:
-                    yield "".join(element)
-                    element = []
-                    is_element = False
-                else:
-                    element.append(line)
-            elif "<page" in line:
-                is_element = True
+    for line in lines:
+        if is_element:
+            if "/page>" in line:
+                yield "".join(element)
+                element = []
+                is_element = False
+            else:
+                element.append(line)
+        elif "<page" in line:
+            is_element = True
 
 
 def xml_parse_element(element: str, head_sections_matcher: Callable[[str], Iterator[str]]) -> tuple[str, str]:
@@ -64,29 +124,90 @@ def xml_parse_element(element: str, head_sections_matcher: Callable[[str], Itera
     return "", ""
 
 
-def process(file: Path, locale: str) -> dict[str, str]:
-    """Process the big XML file and retain only information we are interested in."""
-    words: dict[str, str] = defaultdict(str)
-    lang_src, lang_dst = utils.guess_locales(locale, use_log=False)
-
-    log.info("Processing %s for destination lang %r ...", file, lang_dst)
-
+@cache
+def get_head_sections_matcher(lang_src: str, lang_dst: str) -> Callable[[str], Iterator[str]]:
+    """Get the function used to check whether a Wikicode contains an interesting head section."""
     if lang_src == "de":
         # It is not possible to use a regexp matcher
         def head_sections_matcher(wikicode: str) -> Iterator[str]:
             return (s for s in lang.head_sections[lang_dst] if s in wikicode.lower())
-    else:
-        head_sections_matcher = re.compile(
-            rf"^=*\s*(?:{'|'.join(hs.replace('{', r'\{').replace('|', r'\|') for hs in lang.head_sections[lang_dst])})",
-            flags=re.IGNORECASE | re.MULTILINE,
-        ).finditer  # type: ignore[assignment]
 
-    for element in xml_iter_parse(file):
+        return head_sections_matcher
+
+    return re.compile(
+        rf"^=*\s*(?:{'|'.join(hs.replace('{', r'\{').replace('|', r'\|') for hs in lang.head_sections[lang_dst])})",
+        flags=re.IGNORECASE | re.MULTILINE,
+    ).finditer  # type: ignore[return-value]
+
+
+def process_elements(elements: Iterable[str], locale: str) -> dict[str, str]:
+    """Retain only information we are interested in from XML `<page>` elements.
+    Only parts of the Wikicode holding interesting head sections are kept.
+    """
+    words: dict[str, str] = defaultdict(str)
+    lang_src, lang_dst = utils.guess_locales(locale, use_log=False)
+    head_sections_matcher = get_head_sections_matcher(lang_src, lang_dst)
+
+    for element in elements:
         word, code = xml_parse_element(element, head_sections_matcher)
         if word and code:
             if lang_dst == "en" and word[:19] == "Unsupported titles/":
                 continue
-            words[unescape(word)] = unescape(code)
+            if code := utils.slice_head_sections(unescape(code), lang_dst):
+                words[unescape(word)] = code
+
+    return words
+
+
+def process(file: Path, locale: str) -> dict[str, str]:
+    """Process the big XML file and retain only information we are interested in."""
+    _, lang_dst = utils.guess_locales(locale, use_log=False)
+    log.info("Processing %s for destination lang %r ...", file, lang_dst)
+    return process_elements(xml_iter_parse(file), locale)
+
+
+def read_multistream_index(file: Path) -> list[int]:
+    """Get sorted offsets of BZ2 streams from a multistream dump index.
+    Each line is formatted as `OFFSET:PAGE_ID:TITLE`, and there are 100 pages per stream.
+    """
+    with bz2.open(file, mode="rt", encoding="utf-8") as fh:
+        return sorted({int(line.split(":", 1)[0]) for line in fh if line.strip()})
+
+
+def process_streams(file: Path, locale: str, boundaries: tuple[int, int]) -> dict[str, str]:
+    """Process consecutive BZ2 streams of a multistream dump, from offset `start` to `end` (-1 meaning EOF)."""
+    start, end = boundaries
+    with file.open(mode="rb") as fh:
+        fh.seek(start)
+        data = fh.read(end - start if end > -1 else -1)
+
+    lines = bz2.decompress(data).decode("utf-8").splitlines(keepends=True)
+    return process_elements(xml_iter_parse_lines(lines), locale)
+
+
+def process_multistream(
+    file: Path,
+    index: Path,
+    locale: str,
+    *,
+    workers: int = 0,
+    streams_per_task: int = STREAMS_PER_TASK,
+) -> dict[str, str]:
+    """Process the multistream XML file using several processes, and retain only information we are interested in.
+    Each BZ2 stream can be decompressed independently, so they are spread across workers.
+    """
+    _, lang_dst = utils.guess_locales(locale, use_log=False)
+    log.info("Processing %s for destination lang %r ...", file, lang_dst)
+
+    offsets = read_multistream_index(index)
+    starts = offsets[::streams_per_task]
+    ends = [*starts[1:], -1]
+
+    words: dict[str, str] = defaultdict(str)
+    with multiprocessing.Pool(processes=workers or None) as pool:
+        # Results are ordered so that duplicate titles resolve the same way as the sequential parsing
+        for partial_words in pool.imap(partial(process_streams, file, locale), zip(starts, ends)):
+            words |= partial_words
 
     return words
 
@@ -98,16 +219,39 @@ def save(output: Path, words: dict[str, str]) -> None:
         return
 
     output.parent.mkdir(exist_ok=True, parents=True)
-    with output.open(mode="w", encoding="utf-8") as fh:
-        json.dump(words, fh, ensure_ascii=False, indent=4, sort_keys=True)
-
-    log.info("Saved %s words into %s", f"{len(words):,}", output)
+    count = utils.write_json_lines(output, sorted(words.items()))
+    log.info("Saved %s words into %s", f"{count:,}", output)
 
 
 def get_latest_xml_file(source_dir: Path) -> Path | None:
-    """Get the name of the last pages-*.xml file."""
-    files = list(source_dir.glob(f"pages-{'[0-9]' * 8}.xml"))
-    return sorted(files)[-1] if files else None
+    """Get the name of the last pages-*.xml file.
+    When a snapshot was not uncompressed, its pages-*.xml.bz2 file is returned to be streamed instead.
+    """
+    files = {get_snapshot(file): file for file in source_dir.glob(f"pages-{'[0-9]' * 8}.xml.bz2")}
+    files |= {get_snapshot(file): file for file in source_dir.glob(f"pages-{'[0-9]' * 8}.xml")}
+    return files[max(files)] if files else None
+
+
+def get_latest_multistream_files(source_dir: Path) -> tuple[Path, Path] | None:
+    """Get the names of the last pages-multistream-*.xml.bz2 file, and its index."""
+    for file in sorted(source_dir.glob(f"pages-multistream-{'[0-9]' * 8}.xml.bz2"), reverse=True):
+        index = source_dir / f"pages-multistream-index-{get_snapshot(file)}.txt.bz2"
+        if index.is_file():
+            return file, index
+    return None
+
+
+def get_snapshot(file: Path) -> str:
+    """Get the snapshot date of a dump file.
+
+    >>> get_snapshot(Path("pages-20250401.xml"))
+    '20250401'
+    >>> get_snapshot(Path("pages-20250401.xml.bz2"))
+    '20250401'
+    >>> get_snapshot(Path("pages-multistream-index-20250401.txt.bz2"))
+    '20250401'
+    """
+    return file.name.split(".", 1)[0].split("-")[-1]
 
 
 def get_source_dir(lang_src: str) -> Path:
@@ -115,26 +259,38 @@ def get_source_dir(lang_src: str) -> Path:
 
 
 def get_output_file(source_dir: Path, lang_src: str, lang_dst: str, snapshot: str) -> Path:
-    return source_dir.parent / lang_dst / lang_src / f"data_wikicode-{snapshot}.json"
+    return source_dir.parent / lang_dst / lang_src / f"data_wikicode-{snapshot}.jsonl"
 
 
-def main(locale: str) -> int:
-    """Entry point."""
+def main(locale: str, *, workers: int = 0) -> int:
+    """Entry point.
+    When a multistream dump is available, and not older than the regular one, it is parsed using *workers* processes.
+    """
 
     start = monotonic()
     lang_src, lang_dst = utils.guess_locales(locale)
 
     source_dir = get_source_dir(lang_src)
-    if not (input_file := get_latest_xml_file(source_dir)):
+    input_file = get_latest_xml_file(source_dir)
+    multistream = get_latest_multistream_files(source_dir)
+    if multistream and (not input_file or get_snapshot(multistream[0]) >= get_snapshot(input_file)):
+        input_file = multistream[0]
+    else:
+        multistream = None
+
+    if not input_file:
         log.error("No dump found. Run with --download first ... ")
         return 1
 
     ret = 0
-    output = get_output_file(source_dir, lang_src, lang_dst, input_file.stem.split("-")[-1])
+    output = get_output_file(source_dir, lang_src, lang_dst, get_snapshot(input_file))
     if output.is_file():
         log.info("Already parsed into %s", output)
     else:
-        words = process(input_file, locale)
+        if multistream:
+            words = process_multistream(*multistream, locale, workers=workers)
+        else:
+            words = process(input_file, locale)
         save(output, words)
         if not words:
             ret = 1
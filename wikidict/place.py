@@ -1,13 +1,31 @@
 import re
 from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched
 from logging import getLogger
 
 from . import caches, constants
+from .session import TokenBucket
+from .user_functions import extract_keywords_from
 
 log = getLogger(__name__)
 UNWANTED_TAGS = {"a", "div", "p", "span"}
 WANTED_TAGS = {"b", "/b", "i", "/i", "small", "/small"}
-CACHE = caches.load_cache_file("places")
+CACHE = caches.Cache("places")
+
+# Locales rendering the template using the Wiktionary API, see `render_place()` of their template handlers
+LOCALES = ("en", "zh")
+
+# Templates are parsed by batches, separated by a paragraph of this text, using `WORKERS` concurrent requests,
+# and at most one request every `REQUEST_INTERVAL` seconds
+BATCH_SIZE = 50
+BATCH_SEPARATOR = "wikidict-place-separator"
+WORKERS = 4
+REQUEST_INTERVAL = 0.5
+
+# Templates without nested templates, links, nor HTML tags, those are seen by `get()` as they are written
+RE_PLACE = re.compile(r"{{(place\|[^{}\[\]<>]+)}}")
 
 
 def sanitize(html: str) -> str:
@@ -30,25 +48,96 @@ def sanitize(html: str) -> str:
     return html.strip()
 
 
-def retrieve_parser_output(wikitext: str, locale: str) -> str:
+def retrieve_parser_outputs(wikitexts: list[str], locale: str, *, url: str = "") -> list[str]:
+    """Parse several `wikitexts` in one request, and return their sanitized HTML."""
     params = {
         "action": "parse",
         "contentmodel": "wikitext",
         "disablelimitreport": "1",
         "format": "json",
         "prop": "text",
-        "text": wikitext,
+        "text": f"\n\n{BATCH_SEPARATOR}\n\n".join(wikitexts),
     }
-    with constants.SESSION.get(constants.WIKTIONARY_URL_API.format(locale=locale), params=params, timeout=10) as req:
-        result = req.json()["parse"]["text"]["*"]
-    return sanitize(result)
+    url = url or constants.WIKTIONARY_URL_API.format(locale=locale)
+    with constants.SESSION.post(url, data=params, timeout=10) as req:
+        req.raise_for_status()
+        results = req.json()["parse"]["text"]["*"].split(BATCH_SEPARATOR)
+    if len(results) != len(wikitexts):
+        raise ValueError(f"Expected {len(wikitexts)} parser outputs, got {len(results)}")
+    return [sanitize(result) for result in results]
 
 
-def get(parts: list[str], data: defaultdict[str, str], locale: str) -> str:
+def retrieve_parser_output(wikitext: str, locale: str) -> str:
+    return retrieve_parser_outputs([wikitext], locale)[0]
+
+
+def get_wikitext(parts: list[str], data: defaultdict[str, str]) -> str:
+    """
+    >>> get_wikitext(["en", "city", "s/Texas"], defaultdict(str, {"t": "Austin"}))
+    '{{place|en|city|s/Texas|t=Austin}}'
+    """
     template = ["place"] + parts
     if data:
         template.extend(f"{k}={v}" for k, v in sorted(data.items()))
-    wikitext = f"{{{{{'|'.join(template)}}}}}"
+    return f"{{{{{'|'.join(template)}}}}}"
+
+
+def find_places(code: str) -> set[str]:
+    """Find templates of a given Wikicode, as they will be retrieved by `get()`.
+
+    >>> sorted(find_places("# {{place|en|city|s/Texas|t = Austin}}, {{place|en|{{w|Paris}}}}, {{place|zh|城市}}"))
+    ['{{place|en|city|s/Texas|t=Austin}}', '{{place|zh|城市}}']
+    """
+    places = set()
+    for template in RE_PLACE.findall(code):
+        # Same as `utils.transform()`, and `render_template()` of template handlers
+        _, *parts = (part.strip().strip("\u200e") for part in template.split("|"))
+        data = extract_keywords_from(parts)
+        places.add(get_wikitext(parts, data))
+    return places
+
+
+def prefetch(
+    pages: Iterable[tuple[str, str]],
+    locale: str,
+    *,
+    url: str = "",
+    batch_size: int = BATCH_SIZE,
+    workers: int = WORKERS,
+    interval: float = REQUEST_INTERVAL,
+) -> int:
+    """Retrieve, by batches, templates of `pages` missing from the cache, and return the number of new ones.
+    They are stored into the cache database of the data folder, all at once.
+    """
+    if locale not in LOCALES:
+        return 0
+    places = {wikitext for _, code in pages for wikitext in find_places(code)}
+    if not (missing := sorted(wikitext for wikitext in places if not CACHE.get(wikitext))):
+        return 0
+
+    log.info("Retrieving %s places ...", f"{len(missing):,}")
+    bucket = TokenBucket(1 / interval) if interval else None
+
+    def retrieve(batch: tuple[str, ...]) -> dict[str, str]:
+        if bucket:
+            bucket.acquire()
+        try:
+            return dict(zip(batch, retrieve_parser_outputs(list(batch), locale, url=url)))
+        except Exception:
+            log.exception("ERROR retrieving %s places, starting with %r", len(batch), batch[0])
+            return {}
+
+    results: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for retrieved in executor.map(retrieve, batched(missing, batch_size)):
+            results |= retrieved
+    if results:
+        CACHE.save(results)
+    return len(results)
+
+
+def get(parts: list[str], data: defaultdict[str, str], locale: str) -> str:
+    wikitext = get_wikitext(parts, data)
 
     if not (cached := CACHE.get(wikitext, "")):
         CACHE[wikitext] = cached = retrieve_parser_output(wikitext, locale)
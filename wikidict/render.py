@@ -3,30 +3,32 @@
 from __future__ import annotations
 
 import dataclasses
-import json
 import logging
 import multiprocessing
 import os
 import re
-from collections import defaultdict
+from collections import defaultdict, deque
+from collections.abc import Mapping
 from contextlib import suppress
 from datetime import timedelta
-from functools import partial
+from itertools import batched
 from pathlib import Path
 from time import monotonic
-from typing import TYPE_CHECKING, Any, cast
+from typing import TYPE_CHECKING
 
 import wikitextparser as wtp
 import wikitextparser._spans
 
-from . import lang, utils
+from . import formulas, lang, place, render_cache, svg, utils
 from .namespaces import namespaces
 from .stubs import Definition, Definitions, Word
 from .user_functions import unique
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+    from multiprocessing.pool import AsyncResult
 
+    from .render_cache import Rendered
     from .stubs import Definitions, SubDefinition, Words
 
 
@@ -55,6 +57,9 @@
 #    DEBUG_EMPTY_WORDS=1 python -m wikidict LOCALE --render >out.log 2>&1
 DEBUG_EMPTY_WORDS = "DEBUG_EMPTY_WORDS" in os.environ
 
+# Number of words sent at once to a worker
+CHUNK_SIZE = 256
+
 log = logging.getLogger(__name__)
 
 
@@ -559,6 +564,10 @@ def parse_word(
     """
     lang_src, lang_dst = utils.guess_locales(locale, use_log=False)
 
+    # Keep only parts holding interesting head sections, and skip pages having none of them
+    if not (code := utils.slice_head_sections(code, lang_dst)):
+        return Word([], [], [], {}, [])
+
     code = adjust_wikicode(code, lang_dst)
     top_sections, parsed_sections = find_sections(word, code, lang_src, lang_dst)
     prons = []
@@ -623,22 +632,23 @@ def parse_word(
     return Word(prons, genders, etymology, definitions, variants)
 
 
-def load(file: Path) -> dict[str, str]:
-    """Load the JSON file containing all words and their details."""
-    with file.open(encoding="utf-8") as fh:
-        words: dict[str, str] = json.load(fh)
-    log.info("Loaded %s words from %s", f"{len(words):,}", file)
-    return words
+def load(file: Path) -> Iterator[tuple[str, str]]:
+    """Load words, and their Wikicode, from the JSON Lines file as they come."""
+    return utils.read_json_lines(file)
 
 
 def render_word(
-    w: list[str],
+    w: Sequence[str],
     words: Words,
     locale: str,
     *,
     all_templates: list[tuple[str, str, str]] | None = None,
 ) -> Word | None:
+    """Render a word, it is added to `words` when it has definitions or variants.
+    Return the rendered word, even without definitions, or None when the rendering failed.
+    """
     word, code = w
+    details = None
     try:
         details = parse_word(word, code, locale, all_templates=all_templates)
     except KeyboardInterrupt:
@@ -653,23 +663,67 @@ def render_word(
     if DEBUG_EMPTY_WORDS:
         print(f"Empty {word = }", flush=True)
 
-    return None
+    return details
 
 
-def render(in_words: dict[str, str], locale: str, workers: int) -> Words:
-    manager = multiprocessing.Manager()
-    results: Words = cast(dict[str, Word], manager.dict())
-    all_templates: list[tuple[str, str, str]] = cast(list[tuple[str, str, str]], manager.list())
+def render_words(chunk: Iterable[Sequence[str]], locale: str) -> list[Rendered]:
+    """Render a chunk of words, and return each of them alongside its templates statistics.
+    Everything is kept local to the worker, and sent back to the main process in one go.
+    """
+    rendered: list[Rendered] = []
+    for w in chunk:
+        all_templates: list[tuple[str, str, str]] = []
+        details = render_word(w, {}, locale, all_templates=all_templates)
+        rendered.append((w[0], details, utils.compact_templates_stats(all_templates)))
+    return rendered
+
+
+def render(
+    in_words: Mapping[str, str] | Iterable[tuple[str, str]],
+    locale: str,
+    workers: int,
+    *,
+    cache: render_cache.RenderCache | None = None,
+) -> Words:
+    """Render all words using `workers` processes.
+    Words are sent to workers by chunks as they come, so that the rendering starts right away.
+    When a `cache` is given, words already rendered are reused, and newly rendered ones are stored into it.
+    """
+    results: Words = {}
+    all_templates: list[tuple[str, str, str]] = []
+    pending: deque[AsyncResult[list[Rendered]]] = deque()
+
+    def collect(rendered: list[Rendered]) -> None:
+        for word, details, stats in rendered:
+            all_templates.extend(stats)
+            if details and (details.definitions or details.variants):
+                results[word] = details
+
+    def wait(max_pending: int) -> None:
+        # Results are collected in order, as soon as they are ready, or when too many chunks are pending
+        while len(pending) > max_pending or (pending and pending[0].ready()):
+            rendered = pending.popleft().get()
+            collect(rendered)
+            if cache:
+                cache.add(rendered)
+
+    if isinstance(in_words, Mapping):
+        in_words = in_words.items()
 
     with suppress(KeyboardInterrupt), multiprocessing.Pool(processes=workers) as pool:
-        pool.map(
-            partial(render_word, words=results, locale=locale, all_templates=all_templates),
-            in_words.items(),
-        )
+        for chunk in batched(in_words, CHUNK_SIZE):
+            if cache:
+                cached, missing = cache.load(dict(chunk))
+                collect(cached)
+                chunk = tuple(missing.items())  # noqa: PLW2901
+            if chunk:
+                pending.append(pool.apply_async(render_words, (chunk, locale)))
+            wait(2 * workers)
+        wait(0)
 
-    utils.check_for_missing_templates(list(all_templates))
+    utils.check_for_missing_templates(all_templates)
 
-    return results.copy()
+    return results
 
 
 def save(output: Path, words: Words) -> None:
@@ -679,22 +733,14 @@ def save(output: Path, words: Words) -> None:
         log.warning("No words to save.")
         return
 
-    class EnhancedJSONEncoder(json.JSONEncoder):
-        def default(self, o: object) -> Any:
-            if dataclasses.is_dataclass(o):
-                return dataclasses.asdict(o)  # type: ignore[arg-type]
-            return super().default(o)
-
-    with output.open(mode="w", encoding="utf-8") as fh:
-        json.dump(words, fh, cls=EnhancedJSONEncoder, ensure_ascii=False, indent=4, sort_keys=True)
-    log.info("Saved %s words into %s", f"{len(words):,}", output)
+    count = utils.write_json_lines(output, sorted(words.items()), default=dataclasses.asdict)
+    log.info("Saved %s words into %s", f"{count:,}", output)
 
 
 def get_latest_json_file(source_dir: Path) -> Path | None:
-    """Get the name of the last data_wikicode-*.json file."""
-    if not (files := list(source_dir.glob(f"data_wikicode-{'[0-9]' * 8}.json"))):
-        return None
-    return sorted(files)[-1]
+    """Get the name of the last data_wikicode-*.jsonl file (or data_wikicode-*.json, of the former format)."""
+    files = [file for suffix in ("json", "jsonl") for file in source_dir.glob(f"data_wikicode-{'[0-9]' * 8}.{suffix}")]
+    return sorted(files)[-1] if files else None
 
 
 def get_source_dir(lang_src: str, lang_dst: str) -> Path:
@@ -702,13 +748,26 @@ def get_source_dir(lang_src: str, lang_dst: str) -> Path:
 
 
 def get_output_file(source_dir: Path, snapshot: str) -> Path:
-    return source_dir / f"data-{snapshot}.json"
+    return source_dir / f"data-{snapshot}.jsonl"
 
 
 def hook_after(words: Words) -> None:
     pass
 
 
+def prefetch(pages: Iterable[tuple[str, str]], lang_src: str) -> None:
+    """Retrieve formulas, and places, missing from caches, all at once, so that words rendering never waits for them."""
+    # Only pages that may need it are kept, so that the dump is read once
+    pages = [(word, code) for word, code in pages if "<math" in code or "<chem>" in code or "{{place|" in code]
+
+    if count := svg.migrate():
+        log.info("Optimized %s SVG of the cache", f"{count:,}")
+    if count := formulas.prefetch(pages):
+        log.info("Rendered %s new formulas", f"{count:,}")
+    if count := place.prefetch(pages, lang_src):
+        log.info("Retrieved %s new places", f"{count:,}")
+
+
 def main(locale: str, *, workers: int = multiprocessing.cpu_count()) -> int:
     """Entry point."""
 
@@ -720,12 +779,12 @@ def main(locale: str, *, workers: int = multiprocessing.cpu_count()) -> int:
         log.error("No dump found. Run with --parse first ... ")
         return 1
 
-    log.info("Loading %s ...", input_file)
-    in_words: dict[str, str] = load(input_file)
+    prefetch(load(input_file), lang_src)
 
-    log.info("Rendering ...")
+    log.info("Rendering words from %s ...", input_file)
     workers = workers or multiprocessing.cpu_count()
-    hook_after(words := render(in_words, locale, workers))
+    with render_cache.RenderCache(source_dir, lang_src, lang_dst) as cache:
+        hook_after(words := render(load(input_file), locale, workers, cache=cache))
 
     ret = 1
     if words:
@@ -733,5 +792,10 @@ def main(locale: str, *, workers: int = multiprocessing.cpu_count()) -> int:
         save(output, words)
         ret = 0
 
+    log.info(
+        "SVG optimized %s times, in %s",
+        f"{svg.SCOUR_STATS['calls']:,}",
+        timedelta(seconds=svg.SCOUR_STATS["seconds"]),
+    )
     log.info("Render done in %s!", timedelta(seconds=monotonic() - start))
     return ret
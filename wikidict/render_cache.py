@@ -0,0 +1,175 @@
+"""Incremental render cache: words of unchanged pages are not rendered again from a snapshot to another."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from . import formulas, place, svg, utils
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+    from .stubs import Word
+
+    Stats = list[tuple[str, str, str]]
+    Rendered = tuple[str, Word | None, Stats]
+
+log = logging.getLogger(__name__)
+
+ROOT = Path(__file__).parent
+
+# Files involved in the rendering, whatever the locale.
+# Files of source, and destination, locales are added to those.
+# Caches of formulas, and places, are not: their values are part of the key of words using them.
+FILES = (
+    "constants.py",
+    "demotic.py",
+    "formulas.py",
+    "hiero.py",
+    "hiero_utils.py",
+    "lang/__init__.py",
+    "lang/defaults.py",
+    "namespaces.py",
+    "part_of_speech.py",
+    "place.py",
+    "render.py",
+    "stubs.py",
+    "svg.py",
+    "user_functions.py",
+    "utils.py",
+)
+
+
+def get_files(lang_src: str, lang_dst: str) -> list[Path]:
+    """Get all files involved in the rendering of a given locale."""
+    files = [ROOT / file for file in FILES]
+    for locale in sorted({lang_src, lang_dst}):
+        files.extend(sorted((ROOT / "lang" / locale).rglob("*.py")))
+    return files
+
+
+def get_fingerprint(lang_src: str, lang_dst: str) -> str:
+    """Compute the fingerprint of the code, and data, used to render words of a given locale."""
+    digest = hashlib.sha256(f"{lang_src}:{lang_dst}:{utils.KEEP_UNFINISHED}".encode())
+    for file in get_files(lang_src, lang_dst):
+        digest.update(file.relative_to(ROOT).as_posix().encode())
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def get_cached_values(code: str, lang_src: str) -> list[str]:
+    """Get values retrieved from caches to render a given wikicode: SVG of its formulas, and expanded places."""
+    values = [svg.get(formula) for formula in sorted(formulas.find_formulas(code))]
+    if lang_src in place.LOCALES and "{{place|" in code:
+        values.extend(place.CACHE.get(wikitext) for wikitext in sorted(place.find_places(code)))
+    return values
+
+
+def get_key(word: str, code: str, lang_src: str) -> bytes:
+    """Compute the key of a word in the cache, it changes as soon as its wikicode changes,
+    or as soon as a cached value used to render it changes.
+    """
+    digest = hashlib.sha256(f"{word}\0{code}".encode())
+    for value in get_cached_values(code, lang_src):
+        digest.update(f"\0{value}".encode())
+    return digest.digest()
+
+
+class RenderCache:
+    """
+    SQLite database of rendered words, keyed by the hash of their wikicode, and of cached values they use.
+
+    The database file is tied to the fingerprint of the rendering code: when it changes, the previous
+    database is discarded. Only words of the current snapshot are kept, so that the file does not grow forever.
+    """
+
+    def __init__(self, folder: Path, lang_src: str, lang_dst: str) -> None:
+        self.folder = folder
+        self.lang_src = lang_src
+        self.file = folder / f"render-cache-{get_fingerprint(lang_src, lang_dst)[:16]}.sqlite"
+        # Keys of words being rendered, until they are added
+        self.keys: dict[str, bytes] = {}
+        self.loaded = 0
+        self.reused = 0
+        self._tmp = self.file.with_name(f"{self.file.name}.tmp")
+        self._con: sqlite3.Connection | None = None
+        self._has_previous = False
+
+    def __enter__(self) -> RenderCache:
+        self.folder.mkdir(exist_ok=True, parents=True)
+        self._tmp.unlink(missing_ok=True)
+        self._con = sqlite3.connect(self._tmp)
+        self._con.execute("PRAGMA journal_mode = OFF")
+        self._con.execute("PRAGMA synchronous = OFF")
+        self._con.execute("CREATE TABLE words (key BLOB PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID")
+        self._con.execute("CREATE TEMP TABLE wanted (key BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._has_previous = self.file.is_file()
+        if self._has_previous:
+            self._con.execute("ATTACH DATABASE ? AS previous", (str(self.file),))
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        assert self._con
+        self._con.commit()
+        self._con.close()
+        self._con = None
+
+        if exc_type is not None or not self.loaded:
+            # Keep the previous database untouched
+            self._tmp.unlink()
+            return
+
+        log.info("Reused %s rendered words from %s", f"{self.reused:,}", self.file)
+        os.replace(self._tmp, self.file)
+        for file in self.folder.glob("render-cache-*.sqlite"):
+            if file != self.file:
+                log.info("Removing the outdated render cache %s", file)
+                file.unlink()
+
+    def load(self, words: dict[str, str]) -> tuple[list[Rendered], dict[str, str]]:
+        """Retrieve already rendered `words`, and return them alongside those that still need to be rendered.
+        It can be called several times, with different words, to work on the whole dump chunk by chunk.
+        """
+        assert self._con
+        keys = {word: get_key(word, code, self.lang_src) for word, code in words.items()}
+        self.loaded += len(keys)
+        if not self._has_previous:
+            self.keys |= keys
+            return [], words
+
+        # Copy still relevant words from the previous database
+        self._con.execute("DELETE FROM wanted")
+        self._con.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((key,) for key in keys.values()))
+        self._con.execute("INSERT OR IGNORE INTO words SELECT key, value FROM previous.words JOIN wanted USING (key)")
+
+        words_by_key = {key: word for word, key in keys.items()}
+        cached: list[Rendered] = [
+            (words_by_key[key], *pickle.loads(value))
+            for key, value in self._con.execute("SELECT key, value FROM words JOIN wanted USING (key)")
+        ]
+        self.reused += len(cached)
+        done = {word for word, _, _ in cached}
+        self.keys |= {word: key for word, key in keys.items() if word not in done}
+        return cached, {word: code for word, code in words.items() if word not in done}
+
+    def add(self, rendered: Iterable[Rendered]) -> None:
+        """Store newly rendered words, those that failed to render are skipped."""
+        assert self._con
+        rows = []
+        for word, details, stats in rendered:
+            key = self.keys.pop(word)
+            if details is not None:
+                rows.append((key, pickle.dumps((details, stats), protocol=pickle.HIGHEST_PROTOCOL)))
+        self._con.executemany("INSERT OR REPLACE INTO words VALUES (?, ?)", rows)
@@ -0,0 +1,245 @@
+"""
+HTTP session shared by all network accesses.
+
+It brings a sized connection pool, a per-host rate limit, retries honoring the Retry-After header,
+and an optional on-disk cache of responses, revalidated using their ETag, or Last-Modified, header.
+Retries can be turned off using HTTP_MAX_RETRIES=0.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from time import monotonic, sleep, time
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.exceptions import NameResolutionError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from requests import PreparedRequest, Response
+
+log = logging.getLogger(__name__)
+
+# Connections kept alive, by host
+POOL_SIZE = 16
+
+# Requests per second, by host, and the burst allowed
+RATE = 10.0
+BURST = 10
+
+# Retries of failed requests, the delay is doubled after each retry, unless the server tells how long to wait.
+# Only requests that can safely be sent twice are retried.
+MAX_RETRIES = 5
+BACKOFF = 1.0  # seconds
+MAX_RETRY_AFTER = 120.0  # seconds
+RETRY_METHODS = {"GET", "HEAD"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def get_cache_file() -> Path:
+    return Path(os.getenv("CWD", "")) / "data" / "http-cache.sqlite"
+
+
+def get_max_retries() -> int:
+    return int(os.getenv("HTTP_MAX_RETRIES", MAX_RETRIES))
+
+
+class TokenBucket:
+    """Let requests go at a sustained `rate` per second, allowing bursts of `capacity` requests, whatever the thread."""
+
+    def __init__(self, rate: float, capacity: int = 1) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Tokens can go below zero: the request reserves its slot, and waits for it outside the lock
+            self._tokens -= 1
+            delay = -self._tokens / self.rate
+        if delay > 0:
+            sleep(delay)
+
+
+class ResponseCache:
+    """
+    SQLite database of successful GET responses having an ETag, or a Last-Modified, header.
+    Responses are always revalidated, the cached content is only used when the server replies 304 Not Modified.
+    """
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+        self.file.parent.mkdir(exist_ok=True, parents=True)
+        self._con = sqlite3.connect(file, check_same_thread=False)
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, headers TEXT NOT NULL, content BLOB NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._con.close()
+
+    def get(self, url: str) -> tuple[CaseInsensitiveDict[str], bytes] | None:
+        with self._lock:
+            row = self._con.execute("SELECT headers, content FROM responses WHERE url = ?", (url,)).fetchone()
+        return (CaseInsensitiveDict(json.loads(row[0])), row[1]) if row else None
+
+    def set(self, url: str, headers: CaseInsensitiveDict[str], content: bytes) -> None:
+        with self._lock, self._con:
+            self._con.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (url, json.dumps(dict(headers)), content)
+            )
+
+
+def get_retry_delay(response: Response, attempt: int, *, backoff: float = BACKOFF) -> float:
+    """Get the delay before retrying a request, from the Retry-After header (seconds, or a date), if any.
+
+    >>> response = requests.Response()
+    >>> get_retry_delay(response, 2)
+    4.0
+    >>> response.headers["Retry-After"] = "3"
+    >>> get_retry_delay(response, 2)
+    3.0
+    >>> response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    >>> get_retry_delay(response, 2)
+    0.0
+    """
+    if not (retry_after := response.headers.get("Retry-After", "").strip()):
+        return backoff * 2.0**attempt
+    if retry_after.isdigit():
+        return min(float(retry_after), MAX_RETRY_AFTER)
+    try:
+        return min(max(parsedate_to_datetime(retry_after).timestamp() - time(), 0.0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return backoff * 2.0**attempt
+
+
+def is_name_resolution_error(exc: requests.RequestException) -> bool:
+    """Tell whether the host name could not be resolved, like when being offline: retrying would not help.
+
+    >>> is_name_resolution_error(requests.ConnectionError(NameResolutionError("example.org", None, None)))
+    True
+    >>> is_name_resolution_error(requests.ConnectionError("Connection reset by peer"))
+    False
+    """
+    reason = exc.args[0] if exc.args else None
+    return isinstance(getattr(reason, "reason", reason), NameResolutionError)
+
+
+class Session(requests.Session):
+    """A `requests.Session` rate limited by host, retrying failed requests, and caching responses when asked."""
+
+    def __init__(
+        self,
+        *,
+        pool_size: int = POOL_SIZE,
+        rate: float = RATE,
+        burst: int = BURST,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF,
+    ) -> None:
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache: ResponseCache | None = None
+        self._buckets: dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+
+    @contextmanager
+    def cached(self, file: Path) -> Iterator[None]:
+        """Cache GET responses into `file` within the context, so that unchanged resources are not fetched again."""
+        previous, self.cache = self.cache, ResponseCache(file)
+        try:
+            yield
+        finally:
+            self.cache.close()
+            self.cache = previous
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        with self._buckets_lock:
+            if (bucket := self._buckets.get(host)) is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:
+        url = request.url or ""
+        cached = None
+        if self.cache and request.method == "GET" and not kwargs.get("stream") and (cached := self.cache.get(url)):
+            headers, _ = cached
+            if etag := headers.get("ETag"):
+                request.headers["If-None-Match"] = etag
+            if last_modified := headers.get("Last-Modified"):
+                request.headers["If-Modified-Since"] = last_modified
+
+        response = self.send_with_retries(request, **kwargs)
+
+        if cached and response.status_code == 304:
+            log.debug("Not modified: %s", url)
+            return self.make_cached_response(request, *cached)
+        if (
+            self.cache
+            and request.method == "GET"
+            and not kwargs.get("stream")
+            and response.status_code == 200
+            and ("ETag" in response.headers or "Last-Modified" in response.headers)
+        ):
+            self.cache.set(url, response.headers, response.content)
+        return response
+
+    def send_with_retries(self, request: PreparedRequest, **kwargs: Any) -> Response:
+        bucket = self.get_bucket(request.url or "")
+        max_retries = self.max_retries if request.method in RETRY_METHODS else 0
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if attempt == max_retries or is_name_resolution_error(exc):
+                    raise
+                delay = self.backoff * 2.0**attempt
+                log.warning("%s on %s, retrying in %s seconds ...", type(exc).__name__, request.url, delay)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                    return response
+                delay = get_retry_delay(response, attempt, backoff=self.backoff)
+                log.warning("HTTP %s on %s, retrying in %s seconds ...", response.status_code, request.url, delay)
+                response.close()
+            sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def make_cached_response(request: PreparedRequest, headers: CaseInsensitiveDict[str], content: bytes) -> Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = headers
+        response._content = content
+        response.encoding = get_encoding_from_headers(headers)
+        response.url = request.url or ""
+        response.request = request
+        return response
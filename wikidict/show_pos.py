@@ -4,19 +4,23 @@
 
 import logging
 import os
+from typing import TYPE_CHECKING
 
-from . import convert, render, utils
-from .stubs import Words
+from . import render, utils
+from .stubs import Word
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
 
 log = logging.getLogger(__name__)
 
 
-def show_pos(words: Words) -> None:
+def show_pos(words: Iterable[tuple[str, Word]]) -> None:
     debug = os.getenv("DEBUG_POS", "")
     text = "\nPart Of Speech:"
     all_pos: list[str] = []
 
-    for word, details in words.items():
+    for word, details in words:
         all_pos.extend(new_pos := details.definitions.keys())
         if debug and any(debug in pos for pos in new_pos):
             print(f"{word!r}: {', '.join(new_pos)}")
@@ -38,6 +42,5 @@ def main(locale: str) -> int:
         return 1
 
     output = render.get_output_file(source_dir, input_file.stem.split("-")[-1])
-    words = convert.load(output)
-    show_pos(words)
+    show_pos((word, Word(**details)) for word, details in utils.read_json_lines(output))
     return 0
@@ -1,11 +1,13 @@
 from logging import getLogger
 from optparse import Values
+from time import monotonic
 
 from scour.scour import scourString
 
 from . import caches
 
-CACHE = caches.load_cache_file("svg")
+# Formulas, and their optimized SVG
+CACHE = caches.Cache("svg")
 SCOUR_OPTIONS = Values(
     defaults={
         "enable_viewboxing": True,
@@ -21,18 +23,54 @@
     }
 )
 
+# Calls to scour, and the time spent into them
+SCOUR_STATS = {"calls": 0, "seconds": 0.0}
+
 log = getLogger(__name__)
 
 
 def get(formula: str) -> str:
-    return CACHE.get(formula, "")
+    """Get the optimized SVG of a formula, or an empty string when it is not in the cache.
+    SVG not optimized yet, like those added by hand, are optimized only once.
+    """
+    if (svg := CACHE.get(formula, "")) and not is_optimized(svg):
+        CACHE[formula] = svg = optimize(svg)
+    return svg
 
 
 def set(formula: str, svg_raw: str) -> None:
-    log.warning("[new SVG] python add-to-cache.py svg %r %r", formula, svg_raw)
-    CACHE[formula] = svg_raw
+    CACHE[formula] = svg = optimize(svg_raw)
+    log.warning("[new SVG] python add-to-cache.py svg %r %r", formula, svg)
+
+
+def save(svgs: dict[str, str]) -> None:
+    """Store newly rendered formulas, into the cache database of the data folder too, so that they are rendered once."""
+    svgs = {formula: optimize(svg_raw) for formula, svg_raw in svgs.items()}
+    CACHE.save(svgs)
+
+
+def migrate() -> int:
+    """Optimize SVG of the cache that are not optimized yet, and return their count."""
+    if svgs := {formula: svg for formula, svg in CACHE.items() if not is_optimized(svg)}:
+        save(svgs)
+    return len(svgs)
+
+
+def is_optimized(svg: str) -> bool:
+    """SVG returned by the Mathoid REST API always have a title, optimized ones have no descriptive elements.
+
+    >>> is_optimized('<svg xmlns="http://www.w3.org/2000/svg"><title>x</title><text>x</text></svg>')
+    False
+    >>> is_optimized(optimize('<svg xmlns="http://www.w3.org/2000/svg"><title>x</title><text>x</text></svg>'))
+    True
+    """
+    return "<title" not in svg
 
 
 def optimize(svg_raw: str) -> str:
     """Optimize a given SVG."""
-    return str(scourString(svg_raw, options=SCOUR_OPTIONS))
+    start = monotonic()
+    svg = str(scourString(svg_raw, options=SCOUR_OPTIONS))
+    SCOUR_STATS["calls"] += 1
+    SCOUR_STATS["seconds"] += monotonic() - start
+    return svg
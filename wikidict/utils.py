@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import json
 import logging
 import os
 import re
@@ -9,6 +10,7 @@
 from collections import defaultdict, namedtuple
 from datetime import UTC, datetime
 from functools import cache, partial
+from itertools import chain
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -18,8 +20,11 @@
 from . import constants, part_of_speech, svg
 from .hiero_utils import render_hiero
 from .lang import (
+    head_sections,
+    head_sections_markers,
     last_template_handler,
     random_word_url,
+    section_level,
     templates_ignored,
     templates_italic,
     templates_multi,
@@ -28,7 +33,11 @@
 from .user_functions import *  # noqa: F403
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Iterable, Iterator
+    from typing import Any
+
+    TemplateMulti = Callable[[str, list[str], str, str], object]
+    HeadSectionsSearcher = Callable[[str], re.Match[str] | None]
 
 
 # Magic words (small part, only data/time related)
@@ -64,9 +73,32 @@
 
 KEEP_UNFINISHED = os.getenv("KEEP_UNFINISHED", "0") == "1"
 
+# Runs of curly brackets, used to build the nesting tree of templates
+RE_BRACES = re.compile(r"{+|}+").finditer
+
+# Lines that may be section headings, their level is computed in `slice_head_sections()`
+RE_HEADINGS = re.compile(r"^=[^\n]*=[ \t]*$", flags=re.MULTILINE).finditer
+
+# HTML comments (multiline supported)
+RE_HTML_COMMENTS = re.compile(r"(?=<!--)([\s\S]*?-->)").sub
+
 log = logging.getLogger(__name__)
 
 
+def compact_templates_stats(all_templates: list[tuple[str, str, str]]) -> list[tuple[str, str, str]]:
+    """Reduce templates statistics to what `check_for_missing_templates()` needs.
+    Checked templates are only counted once, while missed and skipped ones are all kept.
+
+    >>> compact_templates_stats([("a", "w1", "check"), ("a", "w2", "check"), ("b", "w2", "missed")])
+    [('b', 'w2', 'missed'), ('a', '', 'check')]
+    """
+    stats = [stat for stat in all_templates if stat[2] != "check"]
+    stats.extend(
+        (tpl, "", "check") for tpl in dict.fromkeys(tpl for tpl, _, status in all_templates if status == "check")
+    )
+    return stats
+
+
 def check_for_missing_templates(all_templates: list[tuple[str, str, str]]) -> bool:
     missings_counts: dict[str, int] = defaultdict(int)
     missings: dict[str, set[str]] = defaultdict(set)
@@ -297,6 +329,38 @@ def grep(file: Path, pattern: str) -> str:
         return process.communicate()[0].strip().decode("utf-8")
 
 
+def read_json_lines(file: Path) -> Iterator[tuple[str, Any]]:
+    """Read words of a JSON Lines file, one `[word, value]` per line, as they come.
+    Files of the former format, a single JSON object, are supported too.
+    """
+    with file.open(encoding="utf-8") as fh:
+        first_line = fh.readline()
+        if first_line.lstrip().startswith("{"):
+            fh.seek(0)
+            yield from json.load(fh).items()
+            return
+
+        for line in chain((first_line,), fh):
+            if line.strip():
+                word, value = json.loads(line)
+                yield word, value
+
+
+def write_json_lines(
+    file: Path, words: Iterable[tuple[str, Any]], *, default: Callable[[Any], Any] | None = None
+) -> int:
+    """Write `words` into a JSON Lines file, one `[word, value]` per line, and return the count of written words.
+    `default` is used to serialize objects that are not natively supported, like `json.dump()` does.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, sort_keys=True, default=default).encode
+    count = 0
+    with file.open(mode="w", encoding="utf-8") as fh:
+        for word in words:
+            fh.write(f"{encode(word)}\n")
+            count += 1
+    return count
+
+
 @cache
 def is_cyrillic(char: str) -> bool:
     """Check if a character is Cyrillic."""
@@ -569,6 +633,60 @@ def guess_prefix(word: str) -> str:
     return prefix if prefix.isalpha() else "11"
 
 
+@cache
+def get_head_sections_searcher(locale: str) -> HeadSectionsSearcher:
+    """Get the function used to check whether a raw Wikicode may contain an interesting head section.
+    Spaces are not significant in head sections, like in `render.section_title()`.
+    """
+    titles = "|".join(" *".join(re.escape(char) for char in hs.replace(" ", "")) for hs in head_sections[locale])
+    return re.compile(
+        "|".join((rf"^=*\s*(?:{titles})", *head_sections_markers[locale])),
+        flags=re.IGNORECASE | re.MULTILINE,
+    ).search
+
+
+def slice_head_sections(code: str, locale: str) -> str:
+    r"""Cut the raw Wikicode down to parts that may contain an interesting head section.
+    Parts are delimited by headings of the head sections level, or lower, and those without
+    any head section are dropped. An empty string means that there is nothing interesting at all.
+
+    HTML comments are removed beforehand to prevent commented headings from being taken into account.
+
+    >>> code = "== {{langue|en}} ==\n# A.\n== {{langue|fr}} ==\n=== {{S|nom|fr}} ===\n# B.\n== {{langue|es}} ==\n# C."
+    >>> slice_head_sections(code, "fr")
+    '== {{langue|fr}} ==\n=== {{S|nom|fr}} ===\n# B.\n'
+    >>> slice_head_sections("{{=da=}}\n# A.\n== {{langue|en}} ==<!-- x -->\n# B.", "da")
+    '{{=da=}}\n# A.\n'
+    >>> slice_head_sections(code, "da")
+    ''
+    """
+    if "<!--" in code:
+        code = RE_HTML_COMMENTS("", code)
+
+    is_interesting = get_head_sections_searcher(locale)
+    max_level = section_level[locale]
+    parts: list[str] = []
+    start = 0
+
+    for heading in RE_HEADINGS(code):
+        line = heading[0].rstrip(" \t")
+        if not line.strip("="):
+            continue
+        # Same level as for wikitextparser: the lowest count of equal signs on both sides
+        level = min(len(line) - len(line.lstrip("=")), len(line) - len(line.rstrip("=")), 6)
+        if level > max_level:
+            continue
+        if (part := code[start : heading.start()]) and is_interesting(part):
+            parts.append(part)
+        start = heading.start()
+
+    if start == 0:
+        return code if is_interesting(code) else ""
+    if (part := code[start:]) and is_interesting(part):
+        parts.append(part)
+    return "".join(parts)
+
+
 def clean(text: str) -> str:
     r"""Cleans up the provided Wikicode.
     Removes templates, tables, parser hooks, magic words, HTML tags and file embeds.
@@ -765,6 +883,143 @@ def clean(text: str) -> str:
     return text.strip()
 
 
+def expand_templates(
+    word: str,
+    text: str,
+    locale: str,
+    *,
+    all_templates: list[tuple[str, str, str]] | None = None,
+    variant_only: bool = False,
+) -> str | None:
+    """Expand all templates in a single scan: the nesting tree is built first, then evaluated bottom-up.
+    Templates are evaluated level by level, in the same order as `expand_templates_iteratively()`, which is kept
+    for texts that cannot be unambiguously handled that way (odd braces, braces in a template output, etc.).
+    In such a case, None is returned, and *all_templates* is left untouched.
+
+    >>> expand_templates("foo", "{{lien|{{lien|terne|fr}}s|fr}} et {{=}}", "fr")
+    'ternes et ##equal##!##equal##'
+    >>> expand_templates("foo", "{{{1}}}", "fr") is None
+    True
+    """
+    nodes: list[list[str | int]] = []
+    heights: list[int] = []
+    stack: list[tuple[list[str | int], int]] = []
+    pieces: list[str | int] = []
+    height = pos = 0
+
+    for match in RE_BRACES(text):
+        run = match[0]
+        if len(run) % 2:
+            return None
+        if (start := match.start()) > pos:
+            pieces.append(text[pos:start])
+        pos = match.end()
+
+        if run[0] == "{":
+            for _ in range(len(run) // 2):
+                stack.append((pieces, height))
+                pieces, height = [], 0
+            continue
+
+        for _ in range(len(run) // 2):
+            if not stack:
+                # Unopened template
+                pieces.append("}}")
+                continue
+            nodes.append(pieces)
+            heights.append(height)
+            pieces, height = stack.pop()
+            pieces.append(len(nodes) - 1)
+            height = max(height, heights[-1] + 1)
+
+    if not nodes:
+        return text
+
+    if pos < len(text):
+        pieces.append(text[pos:])
+
+    # `variant_only` only applies to the last template, when it wraps all others
+    levels: list[list[int]] = [[] for _ in range(max(heights) + 1)]
+    for idx, level in enumerate(heights):
+        levels[level].append(idx)
+    variant_idx = levels[-1][0] if variant_only and not stack and len(levels[-1]) == 1 else -1
+
+    # Unclosed templates are kept as-is
+    while stack:
+        parent, _ = stack.pop()
+        parent.append("{{")
+        parent.extend(pieces)
+        pieces = parent
+
+    values = [""] * len(nodes)
+    seen: dict[str, int] = {}
+    stats: list[tuple[str, str, str]] | None = None if all_templates is None else []
+    try:
+        for level, indexes in enumerate(levels):
+            for idx in indexes:
+                content = "".join(piece if isinstance(piece, str) else values[piece] for piece in nodes[idx])
+                tpl = f"{{{{{content}}}}}"
+                if seen.setdefault(tpl, level) != level:
+                    # Same template at different levels, it would be replaced at once by the iterative approach
+                    return None
+                if tpl in SPECIAL_TEMPLATES:
+                    value = SPECIAL_TEMPLATES[tpl].placeholder
+                else:
+                    value = transform(word, content, locale, all_templates=stats, variant_only=idx == variant_idx)
+                if "{" in value or "}" in value:
+                    return None
+                values[idx] = value
+    except BaseException:
+        if all_templates is not None and stats:
+            all_templates.extend(stats)
+        raise
+
+    if all_templates is not None and stats:
+        all_templates.extend(stats)
+    return "".join(piece if isinstance(piece, str) else values[piece] for piece in pieces)
+
+
+def expand_templates_iteratively(
+    word: str,
+    text: str,
+    locale: str,
+    *,
+    all_templates: list[tuple[str, str, str]] | None = None,
+    variant_only: bool = False,
+) -> str:
+    """Expand all templates, innermost ones first, until there is nothing left to expand.
+
+    >>> expand_templates_iteratively("foo", "{{lien|{{lien|terne|fr}}s|fr}} et {{=}}", "fr")
+    'ternes et ##equal##!##equal##'
+    """
+    last_template_idx = text.count("{{")
+    current_template_idx = 0
+    while templates := re.findall(r"({{[^{}]*}})", text):
+        for tpl in templates:
+            if tpl in SPECIAL_TEMPLATES:
+                text = text.replace(tpl, SPECIAL_TEMPLATES[tpl].placeholder)
+            else:
+                # Transform the template
+                text = text.replace(
+                    tpl,
+                    transform(
+                        word,
+                        tpl[2:-2],
+                        locale,
+                        all_templates=all_templates,
+                        # `variant_only` is True only when:
+                        #   1. It is predefined;
+                        #   2. And it is the last template in nested templates.
+                        # Ex: [FR] `{{flexion|{{lien|foo}}}}` where:
+                        #   - `lien` should be handled normaly;
+                        #   - while `flexion` should be handled as variant-specific.
+                        variant_only=variant_only and current_template_idx == last_template_idx - 1,
+                    ),
+                )
+        current_template_idx += len(templates)
+    return text
+
+
 def process_templates(
     word: str,
     wikicode: str,
@@ -821,31 +1076,12 @@ def process_templates(
     # {{foo|{{bar|lang|{{baz|args}}}}|123}}
 
     # Handle all templates
-    last_template_idx = text.count("{{")
-    current_template_idx = 0
-    while templates := re.findall(r"({{[^{}]*}})", text):
-        for tpl in templates:
-            if tpl in SPECIAL_TEMPLATES:
-                text = text.replace(tpl, SPECIAL_TEMPLATES[tpl].placeholder)
-            else:
-                # Transform the template
-                text = text.replace(
-                    tpl,
-                    transform(
-                        word,
-                        tpl[2:-2],
-                        locale,
-                        all_templates=all_templates,
-                        # `variant_only` is True only when:
-                        #   1. It is predefined;
-                        #   2. And it is the last template in nested templates.
-                        # Ex: [FR] `{{flexion|{{lien|foo}}}}` where:
-                        #   - `lien` should be handled normaly;
-                        #   - while `flexion` should be handled as variant-specific.
-                        variant_only=variant_only and current_template_idx == last_template_idx - 1,
-                    ),
-                )
-        current_template_idx += len(templates)
+    expanded = expand_templates(word, text, locale, all_templates=all_templates, variant_only=variant_only)
+    if expanded is None:
+        expanded = expand_templates_iteratively(
+            word, text, locale, all_templates=all_templates, variant_only=variant_only
+        )
+    text = expanded
 
     for tpl in SPECIAL_TEMPLATES.values():
         text = text.replace(tpl.placeholder, tpl.value)
@@ -877,9 +1113,15 @@ def process_templates(
     return text.strip()
 
 
-def render_formula(formula: str, *, cat: str = "tex", output_format: str = "svg") -> str:
+def render_formula(
+    formula: str,
+    *,
+    cat: str = "tex",
+    output_format: str = "svg",
+    base_url: str = constants.WIKIMEDIA_URL_BASE,
+) -> str:
     """
-    Convert mathematic/chemical symbols to a SVG string.
+    Convert mathematic/chemical symbols to a SVG string, using the Mathoid REST API available at `base_url`.
 
     Technical details can be found on those websites:
         - https://en.wikipedia.org/api/rest_v1/#/Math
@@ -892,7 +1134,7 @@ def render_formula(formula: str, *, cat: str = "tex", output_format: str = "svg"
         formula = f"\\ce{{{formula}}}"
 
     # 1. Get the formula hash (type can be tex, inline-tex, or chem)
-    url_hash = constants.WIKIMEDIA_URL_MATH_CHECK.format(type=cat)
+    url_hash = constants.WIKIMEDIA_URL_MATH_CHECK.format(base_url=base_url, type=cat)
     with constants.SESSION.post(url_hash, json={"q": formula}) as req:
         req.raise_for_status()
         res = req.json()
@@ -900,19 +1142,21 @@ def render_formula(formula: str, *, cat: str = "tex", output_format: str = "svg"
         formula_hash = req.headers["x-resource-location"]
 
     # 2. Get the rendered formula (format can be svg, mml, or png)
-    url_render = constants.WIKIMEDIA_URL_MATH_RENDER.format(format=output_format, hash=formula_hash)
+    url_render = constants.WIKIMEDIA_URL_MATH_RENDER.format(base_url=base_url, format=output_format, hash=formula_hash)
     with constants.SESSION.get(url_render) as req:
         req.raise_for_status()
         return req.text
 
 
 def formula_to_svg(formula: str, *, cat: str = "tex") -> str:
-    """Return an optimized SVG file as a string."""
-    force = "FORCE_FORMULA_RENDERING" in os.environ
-    if force or not (svg_raw := svg.get(formula)):
-        svg_raw = render_formula(formula, cat=cat, output_format="svg")
-        svg.set(formula, svg_raw)
-    return svg.optimize(svg_raw)
+    """Return an optimized SVG file as a string.
+    Formulas are rendered beforehand, all at once, by `formulas.prefetch()`, those it missed are rendered on demand.
+    """
+    if not (svg_optimized := svg.get(formula)):
+        base_url = os.getenv("MATHOID_URL", constants.WIKIMEDIA_URL_BASE)
+        svg.set(formula, render_formula(formula, cat=cat, base_url=base_url))
+        svg_optimized = svg.get(formula)
+    return svg_optimized
 
 
 def convert_chem(match: str | re.Match[str], word: str) -> str:
@@ -968,6 +1212,24 @@ def table2html(word: str, locale: str, table: wikitextparser.Table) -> str:
     return phrase
 
 
+@cache
+def compile_templates_multi(locale: str) -> dict[str, TemplateMulti]:
+    """Compile *templates_multi* expressions of a given *locale* into functions, once and for all.
+    Expressions are evaluated within this module namespace, so they have access to user functions,
+    and to *tpl*, *parts*, *word*, and *locale*, the same way as if they were evaluated from `transform()`.
+
+    >>> funcs = compile_templates_multi("fr")
+    >>> funcs["nobr"]("nobr", ["nobr", "1 000"], "mot", "fr")
+    '1&nbsp;000'
+    """
+    return {
+        tpl: eval(
+            compile(f"lambda tpl, parts, word, locale: (\n{code}\n)", f"<templates_multi[{locale}][{tpl}]>", "eval")
+        )
+        for tpl, code in templates_multi[locale].items()
+    }
+
+
 def transform(
     word: str,
     template: str,
@@ -1041,8 +1303,8 @@ def transform(
     # Apply transformations
     # Note: using `is not None` below to allow templates returning an empty string.
 
-    if (transformer := templates_multi[locale].get(tpl)) is not None:
-        return str(eval(transformer))
+    if (func := compile_templates_multi(locale).get(tpl)) is not None:
+        return str(func(tpl, parts, word, locale))
 
     if (transformer := templates_other[locale].get(tpl)) is not None:
         return transformer